@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import bz2
+import enum
+import gzip
+import io
+import json
+import lzma
+import tarfile
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Iterator, Optional
+
+import attr
+
+from tabim.config import RenderConfig
+
+BUFFER_SIZE = 1 << 20
+
+MANIFEST_NAME = "MANIFEST.jsonl"
+
+
+class BundleFormat(str, enum.Enum):
+    Zip = "zip"
+    Tar = "tar"
+    JsonLines = "jsonl"
+
+
+class Compression(str, enum.Enum):
+    No = "none"
+    Gzip = "gz"
+    Bzip2 = "bz2"
+    Xz = "xz"
+
+
+_ZIP_COMPRESSION = {
+    Compression.No: zipfile.ZIP_STORED,
+    Compression.Gzip: zipfile.ZIP_DEFLATED,
+    Compression.Bzip2: zipfile.ZIP_BZIP2,
+    Compression.Xz: zipfile.ZIP_LZMA,
+}
+
+_STREAM_COMPRESSION = {
+    Compression.Gzip: lambda stream: gzip.GzipFile(fileobj=stream, mode="wb"),
+    Compression.Bzip2: lambda stream: bz2.BZ2File(stream, mode="wb"),
+    Compression.Xz: lambda stream: lzma.LZMAFile(stream, mode="wb"),
+}
+
+
+_SUFFIX_COMPRESSION = {
+    ".gz": Compression.Gzip,
+    ".bz2": Compression.Bzip2,
+    ".xz": Compression.Xz,
+}
+
+_OPENERS = {
+    Compression.No: open,
+    Compression.Gzip: gzip.open,
+    Compression.Bzip2: bz2.open,
+    Compression.Xz: lzma.open,
+}
+
+
+@attr.s(auto_attribs=True, frozen=True, slots=True)
+class Manifest:
+    name: str
+    source: str
+    source_hash: str
+    track_number: int
+    config: dict[str, Any]
+    # Set for sources that failed to render, which have no entry in the bundle
+    error: Optional[str] = None
+
+    @staticmethod
+    def make(
+        name: str,
+        source: str,
+        source_hash: str,
+        track_number: int,
+        config: RenderConfig,
+        error: Optional[str] = None,
+    ) -> Manifest:
+        return Manifest(
+            name=name,
+            source=source,
+            source_hash=source_hash,
+            track_number=track_number,
+            config=attr.asdict(config),
+            error=error,
+        )
+
+
+class Bundle:
+    """
+    Writes many rendered tabs into a single archive or stream.
+
+    Entries are accumulated in a large write buffer, so that the output
+    is produced in few sequential writes.
+    Zip and tar bundles get a ``MANIFEST.jsonl`` member listing all entries.
+    JSON-lines bundles hold the manifest fields and the tab on every line.
+    Entry names are made unique by adding a counter, and the manifest holds
+    the names actually used.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        bundle_format: BundleFormat,
+        compression: Compression = Compression.No,
+    ):
+        self.bundle_format = BundleFormat(bundle_format)
+        self.compression = Compression(compression)
+        self._manifests: list[Manifest] = []
+        self._names = {MANIFEST_NAME}
+        self._file = open(path, "wb", buffering=BUFFER_SIZE)
+        self._stream: Optional[IO[bytes]] = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+
+        if self.bundle_format == BundleFormat.Zip:
+            self._zip = zipfile.ZipFile(
+                self._file, mode="w", compression=_ZIP_COMPRESSION[self.compression]
+            )
+        elif self.bundle_format == BundleFormat.Tar:
+            mode = "w|"
+            if self.compression != Compression.No:
+                mode += self.compression.value
+            self._tar = tarfile.open(fileobj=self._file, mode=mode, bufsize=BUFFER_SIZE)
+        elif self.compression == Compression.No:
+            self._stream = self._file
+        else:
+            self._stream = _STREAM_COMPRESSION[self.compression](self._file)
+
+    def _unique_name(self, name: str) -> str:
+        path = PurePosixPath(name)
+        unique_name = name
+        counter = 1
+        while unique_name in self._names:
+            counter += 1
+            unique_name = str(path.with_name(f"{path.stem}-{counter}{path.suffix}"))
+        self._names.add(unique_name)
+        return unique_name
+
+    def add(self, tab: str, manifest: Manifest) -> Manifest:
+        """
+        Add a tab, returning its manifest with the name it was stored under.
+        """
+        manifest = attr.evolve(manifest, name=self._unique_name(manifest.name))
+        data = tab.encode("utf-8")
+        if self._zip is not None:
+            self._zip.writestr(manifest.name, data)
+        elif self._tar is not None:
+            self._add_tar_member(manifest.name, data)
+        else:
+            line = dict(attr.asdict(manifest), tab=tab)
+            self._stream.write(json.dumps(line).encode("utf-8") + b"\n")
+
+        self._manifests.append(manifest)
+        return manifest
+
+    def add_error(self, manifest: Manifest) -> Manifest:
+        """
+        Record a source that failed to render, which only appears in the manifest.
+        """
+        manifest = attr.evolve(manifest, name=self._unique_name(manifest.name))
+        if self._stream is not None:
+            line = dict(attr.asdict(manifest), tab=None)
+            self._stream.write(json.dumps(line).encode("utf-8") + b"\n")
+
+        self._manifests.append(manifest)
+        return manifest
+
+    def _add_tar_member(self, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def _manifest_data(self) -> bytes:
+        return "".join(
+            json.dumps(attr.asdict(manifest)) + "\n" for manifest in self._manifests
+        ).encode("utf-8")
+
+    def close(self):
+        try:
+            if self._zip is not None:
+                self._zip.writestr(MANIFEST_NAME, self._manifest_data())
+                self._zip.close()
+            elif self._tar is not None:
+                self._add_tar_member(MANIFEST_NAME, self._manifest_data())
+                self._tar.close()
+            elif self._stream is not self._file:
+                self._stream.close()
+        finally:
+            self._file.close()
+
+    def __enter__(self) -> Bundle:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def guess_bundle_format(path: Path) -> tuple[BundleFormat, Compression]:
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    if suffixes[-1:] == [".zip"]:
+        return BundleFormat.Zip, Compression.Gzip
+    if suffixes[-1:] == [".tgz"]:
+        return BundleFormat.Tar, Compression.Gzip
+
+    compression = Compression.No
+    if suffixes and suffixes[-1] in _SUFFIX_COMPRESSION:
+        compression = _SUFFIX_COMPRESSION[suffixes.pop()]
+
+    if suffixes[-1:] == [".tar"]:
+        return BundleFormat.Tar, compression
+    return BundleFormat.JsonLines, compression
+
+
+def iter_json_lines(stream: IO[bytes]) -> Iterator[dict[str, Any]]:
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json_lines_bundle(path: Path) -> Iterator[dict[str, Any]]:
+    _, compression = guess_bundle_format(path)
+    with _OPENERS[compression](path, "rb") as stream:
+        yield from iter_json_lines(stream)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import enum
+import hashlib
+import io
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+import attr
+import guitarpro
+
+from tabim.song import get_tuning
+
+GP_SUFFIXES = (".gp3", ".gp4", ".gp5")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    subtitle TEXT,
+    artist TEXT,
+    album TEXT,
+    music TEXT,
+    words TEXT,
+    copyright TEXT,
+    tab TEXT,
+    track_count INTEGER,
+    parse_status TEXT NOT NULL,
+    parse_error TEXT
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT NOT NULL REFERENCES songs(path) ON DELETE CASCADE,
+    track_number INTEGER NOT NULL,
+    name TEXT,
+    string_count INTEGER NOT NULL,
+    tuning TEXT NOT NULL,
+    PRIMARY KEY (path, track_number)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    path TEXT NOT NULL REFERENCES songs(path) ON DELETE CASCADE,
+    first_measure INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (path, first_measure)
+);
+CREATE INDEX IF NOT EXISTS songs_title ON songs(title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS songs_artist ON songs(artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS songs_album ON songs(album COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS songs_track_count ON songs(track_count);
+CREATE INDEX IF NOT EXISTS tracks_tuning ON tracks(tuning);
+CREATE INDEX IF NOT EXISTS sections_title ON sections(title COLLATE NOCASE);
+"""
+
+SONG_FIELDS = (
+    "title",
+    "subtitle",
+    "artist",
+    "album",
+    "music",
+    "words",
+    "copyright",
+    "tab",
+)
+
+
+class ParseStatus(str, enum.Enum):
+    Ok = "ok"
+    Error = "error"
+
+
+@attr.s(auto_attribs=True, slots=True)
+class IndexStats:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    # New or changed files that could not be parsed
+    failed: int = 0
+
+
+def open_catalog(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def format_tuning(strings: Sequence[guitarpro.GuitarString]) -> str:
+    return " ".join(note.strip() for note in get_tuning(strings))
+
+
+def iter_gp_files(roots: Iterable[Path]) -> Iterator[Path]:
+    for root in roots:
+        if root.is_file():
+            yield root.resolve()
+            continue
+        for path in sorted(root.rglob("*")):
+            if path.suffix.lower() in GP_SUFFIXES and path.is_file():
+                yield path.resolve()
+
+
+def _section_titles(song: guitarpro.Song) -> list[tuple[int, str]]:
+    return [
+        (number, header.marker.title)
+        for number, header in enumerate(song.measureHeaders, start=1)
+        if header.marker and header.marker.title
+    ]
+
+
+def _store_song(
+    connection: sqlite3.Connection,
+    path: Path,
+    data: bytes,
+    digest: str,
+    mtime_ns: int,
+) -> ParseStatus:
+    """
+    Store the song, along with whether it could be parsed.
+
+    Songs that cannot be parsed are stored as well, with no tracks or sections,
+    so that they are skipped until they change.
+    """
+    song: Optional[guitarpro.Song] = None
+    try:
+        song = guitarpro.parse(io.BytesIO(data))
+        sections = _section_titles(song)
+        status, error = ParseStatus.Ok, None
+    except Exception as e:
+        sections = []
+        status, error = ParseStatus.Error, repr(e)
+
+    tracks = song.tracks if song is not None else []
+
+    connection.execute("DELETE FROM songs WHERE path = ?", (str(path),))
+    connection.execute(
+        f"""
+        INSERT INTO songs (
+            path, mtime_ns, size, hash, {", ".join(SONG_FIELDS)},
+            track_count, parse_status, parse_error
+        ) VALUES ({", ".join("?" * (len(SONG_FIELDS) + 7))})
+        """,
+        (
+            str(path),
+            mtime_ns,
+            len(data),
+            digest,
+            *(getattr(song, field, None) or None for field in SONG_FIELDS),
+            len(tracks) if song is not None else None,
+            status.value,
+            error,
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO tracks VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                str(path),
+                track_number,
+                track.name,
+                len(track.strings),
+                format_tuning(track.strings),
+            )
+            for track_number, track in enumerate(tracks)
+        ],
+    )
+    connection.executemany(
+        "INSERT INTO sections VALUES (?, ?, ?)",
+        [(str(path), first_measure, title) for first_measure, title in sections],
+    )
+    return status
+
+
+def update_catalog(
+    connection: sqlite3.Connection,
+    roots: Sequence[Path],
+    prune: bool = True,
+) -> IndexStats:
+    """
+    Add new and changed Guitar Pro files under ``roots`` to the catalog.
+
+    Files whose mtime and size match the catalog are skipped without being read.
+    Files that were touched but whose content hash did not change are not re-parsed.
+    Files that fail to parse are stored with an error status,
+    and are likewise skipped until they change.
+    """
+    stats = IndexStats()
+    known = {
+        path: (mtime_ns, size, digest)
+        for path, mtime_ns, size, digest in connection.execute(
+            "SELECT path, mtime_ns, size, hash FROM songs"
+        )
+    }
+    seen = set()
+
+    for path in iter_gp_files(roots):
+        seen.add(str(path))
+        stat = path.stat()
+        entry = known.get(str(path))
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            stats.unchanged += 1
+            continue
+
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry and entry[2] == digest:
+            connection.execute(
+                "UPDATE songs SET mtime_ns = ? WHERE path = ?",
+                (stat.st_mtime_ns, str(path)),
+            )
+            stats.unchanged += 1
+            continue
+
+        try:
+            with connection:
+                status = _store_song(connection, path, data, digest, stat.st_mtime_ns)
+        except sqlite3.Error:
+            stats.failed += 1
+            continue
+
+        if status == ParseStatus.Error:
+            stats.failed += 1
+        elif entry:
+            stats.updated += 1
+        else:
+            stats.added += 1
+
+    if prune:
+        resolved_roots = [root.resolve() for root in roots]
+        for path in set(known) - seen:
+            if any(Path(path).is_relative_to(root) for root in resolved_roots):
+                connection.execute("DELETE FROM songs WHERE path = ?", (path,))
+                stats.removed += 1
+
+    connection.commit()
+    return stats
+
+
+def query_catalog(
+    connection: sqlite3.Connection,
+    title: Optional[str] = None,
+    artist: Optional[str] = None,
+    album: Optional[str] = None,
+    tuning: Optional[str] = None,
+    track_count: Optional[int] = None,
+    section: Optional[str] = None,
+    status: Optional[ParseStatus] = None,
+) -> list[str]:
+    """
+    Return the paths of all cataloged songs matching every given filter.
+
+    Text filters are case-insensitive exact matches.
+    ``tuning`` matches any track, and is given as space separated notes from the
+    highest string down, e.g. ``"e B G D A E"``.
+    """
+    conditions = []
+    params: list = []
+    for column, value in (("title", title), ("artist", artist), ("album", album)):
+        if value is not None:
+            conditions.append(f"{column} = ? COLLATE NOCASE")
+            params.append(value)
+    if track_count is not None:
+        conditions.append("track_count = ?")
+        params.append(track_count)
+    if status is not None:
+        conditions.append("parse_status = ?")
+        params.append(ParseStatus(status).value)
+    if tuning is not None:
+        conditions.append("path IN (SELECT path FROM tracks WHERE tuning = ?)")
+        params.append(" ".join(tuning.split()))
+    if section is not None:
+        conditions.append(
+            "path IN (SELECT path FROM sections WHERE title = ? COLLATE NOCASE)"
+        )
+        params.append(section)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return [
+        path
+        for path, in connection.execute(
+            f"SELECT path FROM songs {where} ORDER BY path", params
+        )
+    ]
@@ -1,4 +1,7 @@
+from __future__ import annotations
+
 import enum
+from typing import Any, Optional
 
 import attr
 
@@ -35,3 +38,37 @@ class LineConfig:
 class RenderConfig:
     header: HeaderConfig = attr.Factory(HeaderConfig)
     line: LineConfig = attr.Factory(LineConfig)
+
+
+def snapshot_config(config: Optional[RenderConfig] = None) -> RenderConfig:
+    """
+    Copy the config for a single render, defaulting to ``RenderConfig()``.
+
+    Rendering only reads its own copy, so the caller may go on changing
+    ``config`` in place, even while renders using it run on other threads.
+    """
+    if config is None:
+        return RenderConfig()
+    return attr.evolve(
+        config, header=attr.evolve(config.header), line=attr.evolve(config.line)
+    )
+
+
+def config_from_dict(overrides: dict[str, dict[str, Any]]) -> RenderConfig:
+    """
+    Build a config from the defaults, overriding the given fields.
+
+    ``overrides`` looks like ``attr.asdict(RenderConfig())``, but may omit any field.
+    """
+    unknown = set(overrides) - {"header", "line"}
+    if unknown:
+        raise ValueError(f"Unknown config sections: {', '.join(sorted(unknown))}")
+
+    line = dict(overrides.get("line", {}))
+    if "lyrics_position" in line:
+        line["lyrics_position"] = LyricsPosition(line["lyrics_position"])
+
+    return RenderConfig(
+        header=HeaderConfig(**overrides.get("header", {})),
+        line=LineConfig(**line),
+    )
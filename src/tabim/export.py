@@ -0,0 +1,235 @@
+"""
+Columnar export of note events, for analytics over many songs.
+
+Every note ``parse_song`` draws becomes one event row.
+NumPy is needed for structured arrays, and PyArrow for Arrow tables and Parquet.
+Both are optional, and are only imported when used.
+"""
+
+from __future__ import annotations
+
+import enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+import guitarpro
+
+from tabim.song import parse_song
+from tabim.types import TabNote
+
+if TYPE_CHECKING:
+    import numpy
+    import pyarrow
+
+
+class NoteEventKind(enum.IntEnum):
+    Play = 0
+    Tie = 1
+    Cont = 2
+
+
+class NoteEffect(enum.IntFlag):
+    Hammer = enum.auto()
+    Slide = enum.auto()
+    Bend = enum.auto()
+    Harmonic = enum.auto()
+    Vibrato = enum.auto()
+    Trill = enum.auto()
+    PalmMute = enum.auto()
+    Staccato = enum.auto()
+    LetRing = enum.auto()
+    GhostNote = enum.auto()
+    Grace = enum.auto()
+    Tremolo = enum.auto()
+
+
+# Column name, NumPy type and Arrow type
+NOTE_EVENT_COLUMNS = (
+    ("song_id", "i4", "int32"),
+    ("track_number", "i2", "int16"),
+    ("measure", "i4", "int32"),
+    ("start", "i8", "int64"),
+    ("duration", "i4", "int32"),
+    ("string", "i1", "int8"),
+    ("fret", "i1", "int8"),
+    ("kind", "i1", "int8"),
+    ("note_type", "i1", "int8"),
+    ("effects", "u2", "uint16"),
+    ("velocity", "i2", "int16"),
+)
+
+NoteEventRow = tuple[int, int, int, int, int, int, int, int, int, int, int]
+
+
+def get_note_effects(effect: guitarpro.NoteEffect) -> NoteEffect:
+    flags = NoteEffect(0)
+    if effect.hammer:
+        flags |= NoteEffect.Hammer
+    if effect.slides:
+        flags |= NoteEffect.Slide
+    if effect.isBend:
+        flags |= NoteEffect.Bend
+    if effect.isHarmonic:
+        flags |= NoteEffect.Harmonic
+    if effect.vibrato:
+        flags |= NoteEffect.Vibrato
+    if effect.isTrill:
+        flags |= NoteEffect.Trill
+    if effect.palmMute:
+        flags |= NoteEffect.PalmMute
+    if effect.staccato:
+        flags |= NoteEffect.Staccato
+    if effect.letRing:
+        flags |= NoteEffect.LetRing
+    if effect.ghostNote:
+        flags |= NoteEffect.GhostNote
+    if effect.isGrace:
+        flags |= NoteEffect.Grace
+    if effect.isTremoloPicking:
+        flags |= NoteEffect.Tremolo
+    return flags
+
+
+def _get_kind(note: TabNote) -> NoteEventKind:
+    if note.is_play:
+        return NoteEventKind.Play
+    if note.is_tie:
+        return NoteEventKind.Tie
+    return NoteEventKind.Cont
+
+
+def iter_note_events(
+    song: guitarpro.Song, track_number: int = 0, song_id: int = 0
+) -> Iterator[NoteEventRow]:
+    """
+    Yield a row for every note event of the track, ordered as ``NOTE_EVENT_COLUMNS``.
+
+    ``fret`` is the fret that sounds, so ties and continuations hold the fret
+    of the note they extend.
+    Every row lasts until the next row on its string, or until its note ends,
+    so the rows of a note split its duration between them, and summing
+    durations over all rows counts every note once.
+    Continuations have no effects or velocity, which belong to the note's attack.
+    """
+    track = song.tracks[track_number]
+    tab = parse_song(song, track_number)
+
+    # The start of the next row on every string, for every beat
+    next_starts = []
+    upcoming: list[Optional[int]] = [None for _ in track.strings]
+    for beat in reversed(tab):
+        next_starts.append(upcoming[:])
+        for string, note in enumerate(beat.notes):
+            if note:
+                upcoming[string] = beat.start
+    next_starts.reverse()
+
+    measure = 0
+    for beat, beat_next_starts in zip(tab, next_starts):
+        if beat.is_measure_break:
+            measure += 1
+            continue
+
+        for string, note in enumerate(beat.notes, start=1):
+            if not note:
+                continue
+
+            kind = _get_kind(note)
+            end = note.note.beat.start + note.note.beat.duration.time
+            next_start = beat_next_starts[string - 1]
+            if next_start is not None:
+                end = min(end, next_start)
+            duration = end - beat.start
+            effects = get_note_effects(note.note.effect)
+            velocity = note.note.velocity
+            if kind == NoteEventKind.Cont:
+                effects = NoteEffect(0)
+                velocity = 0
+
+            yield (
+                song_id,
+                track_number,
+                measure,
+                beat.start,
+                duration,
+                string,
+                note.fret,
+                kind,
+                note.note.type.value,
+                effects,
+                velocity,
+            )
+
+
+def _iter_song_events(
+    songs: Iterable[guitarpro.Song], track_number: Optional[int]
+) -> Iterator[NoteEventRow]:
+    for song_id, song in enumerate(songs):
+        if track_number is None:
+            track_numbers = range(len(song.tracks))
+        else:
+            track_numbers = [track_number]
+        for number in track_numbers:
+            yield from iter_note_events(song, track_number=number, song_id=song_id)
+
+
+def note_events_array(
+    songs: Iterable[guitarpro.Song], track_number: Optional[int] = 0
+) -> numpy.ndarray:
+    """
+    Collect the note events of all songs into a NumPy structured array.
+
+    ``song_id`` is the index of the song in ``songs``.
+    If ``track_number`` is None, all tracks are exported.
+    """
+    import numpy
+
+    dtype = numpy.dtype(
+        [(name, numpy_type) for name, numpy_type, _ in NOTE_EVENT_COLUMNS]
+    )
+    return numpy.fromiter(_iter_song_events(songs, track_number), dtype=dtype)
+
+
+def note_events_table(
+    songs: Iterable[guitarpro.Song], track_number: Optional[int] = 0
+) -> pyarrow.Table:
+    """
+    Like ``note_events_array``, but as an Arrow table.
+    """
+    import pyarrow
+
+    columns: list[list[int]] = [[] for _ in NOTE_EVENT_COLUMNS]
+    for row in _iter_song_events(songs, track_number):
+        for column, value in zip(columns, row):
+            column.append(int(value))
+
+    schema = pyarrow.schema(
+        [(name, arrow_type) for name, _, arrow_type in NOTE_EVENT_COLUMNS]
+    )
+    return pyarrow.Table.from_arrays(
+        [
+            pyarrow.array(column, type=field.type)
+            for column, field in zip(columns, schema)
+        ],
+        schema=schema,
+    )
+
+
+def write_note_events(
+    songs: Iterable[guitarpro.Song],
+    path: Path,
+    track_number: Optional[int] = 0,
+):
+    """
+    Write the note events to ``.parquet`` (using PyArrow) or ``.npy`` (using NumPy).
+    """
+    if path.suffix == ".parquet":
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(note_events_table(songs, track_number), path)
+    elif path.suffix == ".npy":
+        import numpy
+
+        numpy.save(path, note_events_array(songs, track_number))
+    else:
+        raise ValueError(f"Unsupported note events format: {path.suffix}")
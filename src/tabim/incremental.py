@@ -0,0 +1,280 @@
+"""
+Incremental re-rendering of a track after editing its song model.
+
+Measures are parsed one at a time, and the state carried across each measure
+boundary (the live notes) is kept.
+When measures are edited, they are re-parsed, and the change is spread to the
+following measures only while the carried state keeps changing.
+Tie chains are reused where possible, so that the notes after the re-parsed
+measures stay connected to them.
+Continuation marks are retracted and re-applied per measure, and every measure
+holding a note of a chain whose continuation changed is redrawn.
+Finally, only sections and lines whose measures changed are laid out again.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any, Hashable, Iterable, Iterator, Optional, Sequence
+
+import guitarpro
+
+from tabim.config import RenderConfig, snapshot_config
+from tabim.song import (
+    LineCache,
+    formar_header,
+    get_tuning,
+    join_song,
+    parse_lyrics,
+    parse_measure,
+    render_section,
+    render_tab_measure,
+    split_sections,
+)
+from tabim.types import AsciiMeasure, TabBeat, TabNote, TieChain
+from tabim.utils import strip_trailing_whitespace
+
+
+def _iter_tab_notes(beats: Iterable[TabBeat]) -> Iterator[TabNote]:
+    for beat in beats:
+        for note in beat.notes:
+            if note:
+                yield note
+
+
+def _boundary_signature(live_notes: Sequence[Optional[TabNote]]) -> tuple[Any, ...]:
+    # Everything the next measure reads from the notes live at its start
+    return tuple(
+        (
+            None
+            if note is None
+            else (
+                id(note.note),
+                id(note.chain),
+                note.is_play,
+                note.note.beat.start + note.note.beat.duration.time,
+                note.note.type,
+                note.note.value,
+                note.note.effect.hammer,
+                tuple(note.note.effect.slides),
+            )
+        )
+        for note in live_notes
+    )
+
+
+class IncrementalRender:
+    """
+    A rendered track that can be updated after editing the song.
+
+    After changing the notes of some measures in ``song``, call ``update`` with
+    the indices of those measures.
+    The resulting text is always identical to that of ``render_song``.
+    Updates change the instance in place, so they must not run concurrently.
+    """
+
+    def __init__(
+        self,
+        song: guitarpro.Song,
+        track_number: int = 0,
+        config: Optional[RenderConfig] = None,
+    ):
+        config = snapshot_config(config)
+
+        self.song = song
+        self.track = song.tracks[track_number]
+        self.config = config
+        self.n_strings = len(self.track.strings)
+        self.cont_char = "=" if config.line.show_cont else "-"
+
+        self._lyrics = parse_lyrics(song.lyrics.lines[0], self.track)
+        self._beats: list[list[TabBeat]] = []
+        self._live: list[list[Optional[TabNote]]] = []
+        self._signatures: list[tuple[Any, ...]] = []
+        self._chains: list[set[TieChain]] = []
+        for i in range(len(self.track.measures)):
+            beats, live_notes = self._parse(i)
+            self._beats.append(beats)
+            self._live.append(live_notes)
+            self._signatures.append(_boundary_signature(live_notes))
+            self._chains.append({note.chain for note in _iter_tab_notes(beats)})
+
+        self.measures: list[AsciiMeasure] = [
+            self._render(i) for i in range(len(self._beats))
+        ]
+
+        self._line_cache: LineCache = {}
+        self._section_cache: dict[Hashable, tuple[Sequence[AsciiMeasure], str]] = {}
+        self.text = self._layout()
+
+    def _incoming(self, i: int) -> list[Optional[TabNote]]:
+        if i == 0:
+            return [None for _ in range(self.n_strings)]
+        return self._live[i - 1]
+
+    def _parse(self, i: int, known_chains=None):
+        return parse_measure(
+            self.track.measures[i],
+            live_notes=self._incoming(i),
+            lyric_timestamps=self._lyrics,
+            source=i,
+            known_chains=known_chains,
+        )
+
+    def _render(self, i: int) -> AsciiMeasure:
+        *beats, measure_break = self._beats[i]
+        return render_tab_measure(
+            beats,
+            end=measure_break.start,
+            n_strings=self.n_strings,
+            cont_char=self.cont_char,
+        )
+
+    def _reparse(self, i: int) -> set[TieChain]:
+        """
+        Re-parse a measure in place, and return the chains whose continuation changed.
+        """
+        old_notes = list(_iter_tab_notes(self._beats[i]))
+        touched = {note.chain for note in old_notes}
+        touched.update(note.chain for note in self._incoming(i) if note)
+
+        was_cont = {chain: chain.is_cont for chain in touched}
+        for chain in touched:
+            chain.cont_sources.discard(i)
+
+        beats, live_notes = self._parse(
+            i,
+            known_chains={
+                id(note.note): note.chain for note in old_notes if note.is_play
+            },
+        )
+        self._beats[i] = beats
+        self._live[i] = live_notes
+        self._signatures[i] = _boundary_signature(live_notes)
+        self._chains[i] = {note.chain for note in _iter_tab_notes(beats)}
+
+        return {chain for chain, cont in was_cont.items() if chain.is_cont != cont}
+
+    def _rebind(self, i: int, old_live: Sequence[Optional[TabNote]]):
+        # Point the notes of measure ``i`` at the re-parsed notes of the previous one
+        replacements = {
+            id(old): new
+            for old, new in zip(old_live, self._live[i - 1])
+            if old is not None and new is not None
+        }
+        for note in _iter_tab_notes(self._beats[i]):
+            if note.prev_note is not None:
+                note.prev_note = replacements.get(id(note.prev_note), note.prev_note)
+            if note.tie_note is not None:
+                note.tie_note = replacements.get(id(note.tie_note), note.tie_note)
+
+    def _chain_measures(self, chain: TieChain, near: int) -> range:
+        """
+        The measures whose drawing depends on the chain's continuation.
+
+        A chain is drawn over consecutive measures, and the note right after it
+        may be in the next one.
+        """
+        start = near
+        while start > 0 and chain in self._chains[start - 1]:
+            start -= 1
+        end = near
+        while end < len(self._chains) and chain in self._chains[end]:
+            end += 1
+        return range(start, min(end + 1, len(self._chains)))
+
+    def _update_lyrics(self) -> set[int]:
+        lyrics = parse_lyrics(self.song.lyrics.lines[0], self.track)
+        if lyrics == self._lyrics:
+            return set()
+
+        self._lyrics = lyrics
+        changed = set()
+        for i, beats in enumerate(self._beats):
+            for beat in beats:
+                lyric = lyrics.get(beat.start, "")
+                if not beat.is_measure_break and beat.lyric != lyric:
+                    beat.lyric = lyric
+                    changed.add(i)
+        return changed
+
+    def update(self, dirty_measures: Iterable[int]) -> str:
+        """
+        Re-render after the given measures (0-based indices) were edited.
+        """
+        dirty = sorted(set(dirty_measures))
+        for i in dirty:
+            if not 0 <= i < len(self.track.measures):
+                raise IndexError(f"No such measure: {i}")
+        if not dirty:
+            return self.text
+
+        # Lyrics are spread over the beats in order, so edits can shift them.
+        redraw = self._update_lyrics()
+        changed_chains: list[tuple[TieChain, int]] = []
+
+        pending = iter(dirty)
+        i = next(pending)
+        while i < len(self._beats):
+            old_live = self._live[i]
+            old_signature = self._signatures[i]
+            changed_chains.extend((chain, i) for chain in self._reparse(i))
+            redraw.add(i)
+
+            i += 1
+            if self._signatures[i - 1] != old_signature:
+                continue
+
+            # The next measure sees the same state as before
+            if i < len(self._beats):
+                self._rebind(i, old_live)
+            i = next((j for j in pending if j >= i), len(self._beats))
+
+        for chain, near in changed_chains:
+            redraw.update(self._chain_measures(chain, near))
+
+        for i in redraw:
+            self.measures[i] = self._render(i)
+
+        self.text = self._layout()
+        return self.text
+
+    def _layout(self) -> str:
+        line = self.config.line
+        sections = split_sections(
+            measures=self.measures,
+            measure_headers=[measure.header for measure in self.track.measures],
+        )
+        tuning = get_tuning(self.track.strings)
+
+        output = io.StringIO()
+        section_cache = {}
+        for section in sections:
+            key = (section.first_measure, section.title, *map(id, section.measures))
+            cached = self._section_cache.get(key)
+            if cached:
+                rendered_section = cached[1]
+            else:
+                rendered_section = render_section(
+                    section=section,
+                    line_length=line.line_length,
+                    tuning=tuning,
+                    show_lyrics=line.show_lyrics,
+                    bar_numbers=line.show_bar_numbers,
+                    lyrics_position=line.lyrics_position,
+                    line_cache=self._line_cache,
+                )
+            # Keep the measures alive, so that their ids are not reused
+            section_cache[key] = (section.measures, rendered_section)
+            print(rendered_section, file=output)
+        self._section_cache = section_cache
+
+        current = set(map(id, self.measures))
+        self._line_cache = {
+            key: value
+            for key, value in self._line_cache.items()
+            if current.issuperset(key)
+        }
+
+        body = strip_trailing_whitespace(output.getvalue())
+        return join_song(formar_header(self.song, self.config), body)
@@ -1,16 +1,57 @@
-from pathlib import Path
-from typing import Optional
+import hashlib
+import io
+import sys
+from pathlib import Path, PurePosixPath
+from typing import Iterator, List, Optional
 
+import attr
 import guitarpro
 import typer
 
+from tabim.bundle import (
+    Bundle,
+    BundleFormat,
+    Compression,
+    Manifest,
+    guess_bundle_format,
+)
+from tabim.catalog import (
+    ParseStatus,
+    iter_gp_files,
+    open_catalog,
+    query_catalog,
+    update_catalog,
+)
 from tabim.config import HeaderConfig, LineConfig, LyricsPosition, RenderConfig
+from tabim.export import write_note_events
+from tabim.pages import PaginatedSong
+from tabim.score import render_score
 from tabim.song import render_song
+from tabim.types import Deadline
+from tabim.worker import serve
 
+app = typer.Typer()
 
-def main(
-    gp_path: Path,
+
+def iter_sources(gp_paths: List[Path]) -> Iterator[tuple[Path, str]]:
+    """
+    Yield every Guitar Pro file along with its name relative to the given root.
+    """
+    for root in gp_paths:
+        if not root.is_dir():
+            yield root, root.name
+            continue
+        for path in iter_gp_files([root]):
+            yield path, path.relative_to(root.resolve()).as_posix()
+
+
+@app.command()
+def render(
+    gp_paths: List[Path],
     out_path: Optional[Path] = None,
+    bundle: Optional[Path] = None,
+    bundle_format: Optional[BundleFormat] = None,
+    compression: Optional[Compression] = None,
     track_number: int = 0,
     show_title: bool = True,
     center_title: bool = True,
@@ -27,10 +68,27 @@ def main(
     split_sections: bool = True,
     lyrics_position: LyricsPosition = LyricsPosition.Top,
     show_cont: bool = True,
+    page_height: Optional[int] = typer.Option(
+        None, help="Break the tab into pages of this many lines"
+    ),
+    page: Optional[int] = typer.Option(
+        None, help="Only render this page (starting from 1), requires --page-height"
+    ),
+    timeout: Optional[float] = typer.Option(
+        None, help="Seconds to spend on each file, the rest of the tab is cut off"
+    ),
 ):
-    with gp_path.open("rb") as stream:
-        song = guitarpro.parse(stream)
+    """
+    Render Guitar Pro files to ASCII tab.
 
+    With --bundle, all files (directories are searched recursively) are written
+    into a single zip, tar or JSON-lines archive, along with a manifest.
+    The format and compression are guessed from the bundle's suffix unless given.
+    Without it, several files printed together are each preceded by their name.
+
+    With --page-height, pages are separated by form feeds.
+    With --timeout, a tab that takes too long ends with a truncation notice.
+    """
     config = RenderConfig(
         HeaderConfig(
             show_title=show_title,
@@ -53,14 +111,235 @@ def main(
         ),
     )
 
-    rendered_song = render_song(song, config=config, track_number=track_number)
+    if page is not None and not page_height:
+        raise typer.BadParameter("--page requires --page-height.")
+    if timeout is not None and page_height:
+        raise typer.BadParameter("--timeout cannot be used with --page-height.")
+    if bundle and (page_height or page is not None):
+        raise typer.BadParameter(
+            "--page-height and --page cannot be used with --bundle."
+        )
+
+    def get_deadline() -> Optional[Deadline]:
+        if timeout is None:
+            return None
+        return Deadline.after(timeout)
+
+    if bundle:
+        guessed_format, guessed_compression = guess_bundle_format(bundle)
+        with Bundle(
+            bundle,
+            bundle_format=bundle_format or guessed_format,
+            compression=compression or guessed_compression,
+        ) as output:
+            failed = 0
+            for gp_path, name in iter_sources(gp_paths):
+                manifest = Manifest.make(
+                    name=PurePosixPath(name).with_suffix(".tab").as_posix(),
+                    source=str(gp_path),
+                    source_hash="",
+                    track_number=track_number,
+                    config=config,
+                )
+                try:
+                    data = gp_path.read_bytes()
+                    manifest = attr.evolve(
+                        manifest, source_hash=hashlib.sha256(data).hexdigest()
+                    )
+                    song = guitarpro.parse(io.BytesIO(data))
+                    rendered_song = render_song(
+                        song,
+                        config=config,
+                        track_number=track_number,
+                        deadline=get_deadline(),
+                    )
+                except Exception as e:
+                    # A single bad file should not stop a large batch
+                    output.add_error(attr.evolve(manifest, error=repr(e)))
+                    failed += 1
+                    continue
+
+                output.add(rendered_song, manifest)
+
+        if failed:
+            typer.echo(f"{failed} files failed to render, see the manifest.", err=True)
+        return
+
+    if out_path and len(gp_paths) > 1:
+        raise typer.BadParameter("Use --bundle to render more than one file.")
+    if any(gp_path.is_dir() for gp_path in gp_paths):
+        raise typer.BadParameter("Directories require --bundle.")
+
+    for gp_path in gp_paths:
+        with gp_path.open("rb") as stream:
+            song = guitarpro.parse(stream)
+
+        if page_height:
+            paginated = PaginatedSong(
+                song, page_height, track_number=track_number, config=config
+            )
+            if page is None:
+                rendered_song = "\f".join(
+                    paginated.render_page(i) for i in range(len(paginated))
+                )
+            elif 1 <= page <= len(paginated):
+                rendered_song = paginated.render_page(page - 1)
+            else:
+                raise typer.BadParameter(
+                    f"--page must be between 1 and {len(paginated)}."
+                )
+        else:
+            rendered_song = render_song(
+                song,
+                config=config,
+                track_number=track_number,
+                deadline=get_deadline(),
+            )
+
+        if out_path:
+            with out_path.open("w") as f:
+                f.write(rendered_song)
+        else:
+            if len(gp_paths) > 1:
+                # Like ``head``, name every file when printing several
+                print(f"==> {gp_path} <==")
+            print(rendered_song)
+
+
+@app.command()
+def score(
+    gp_path: Path,
+    out_path: Optional[Path] = None,
+    track_number: Optional[List[int]] = typer.Option(
+        None, help="A track to include, can be repeated. Defaults to all tracks"
+    ),
+    line_length: int = 60,
+    show_lyrics: bool = True,
+    show_bar_numbers: bool = True,
+    lyrics_position: LyricsPosition = LyricsPosition.Top,
+    show_cont: bool = True,
+):
+    """
+    Render several tracks of a Guitar Pro file as a score, with aligned beats.
+    """
+    config = RenderConfig(
+        HeaderConfig(),
+        LineConfig(
+            line_length=line_length,
+            show_lyrics=show_lyrics,
+            show_bar_numbers=show_bar_numbers,
+            lyrics_position=lyrics_position,
+            show_cont=show_cont,
+        ),
+    )
+
+    with gp_path.open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    rendered_score = render_score(
+        song, track_numbers=track_number or None, config=config
+    )
 
     if out_path:
         with out_path.open("w") as f:
-            f.write(rendered_song)
+            f.write(rendered_score)
     else:
-        print(rendered_song)
+        print(rendered_score)
+
+
+@app.command()
+def index(
+    roots: List[Path],
+    catalog: Path = Path("tabim.db"),
+    prune: bool = True,
+):
+    """
+    Build or incrementally update a catalog of the Guitar Pro files under ROOTS.
+    """
+    with open_catalog(catalog) as connection:
+        stats = update_catalog(connection, roots, prune=prune)
+
+    print(
+        f"added: {stats.added}, updated: {stats.updated}, "
+        f"unchanged: {stats.unchanged}, removed: {stats.removed}, "
+        f"failed: {stats.failed}"
+    )
+
+
+@app.command()
+def query(
+    catalog: Path = Path("tabim.db"),
+    title: Optional[str] = None,
+    artist: Optional[str] = None,
+    album: Optional[str] = None,
+    tuning: Optional[str] = None,
+    track_count: Optional[int] = None,
+    section: Optional[str] = None,
+    status: Optional[ParseStatus] = None,
+):
+    """
+    List the cataloged files matching all the given filters.
+    """
+    with open_catalog(catalog) as connection:
+        paths = query_catalog(
+            connection,
+            title=title,
+            artist=artist,
+            album=album,
+            tuning=tuning,
+            track_count=track_count,
+            section=section,
+            status=status,
+        )
+
+    for path in paths:
+        print(path)
+
+
+@app.command()
+def export(
+    gp_paths: List[Path],
+    out_path: Path = typer.Option(..., help="A .npy or .parquet file"),
+    track_number: int = typer.Option(
+        0, help="The track to export, or all tracks if negative"
+    ),
+):
+    """
+    Export the note events of Guitar Pro files as a columnar table.
+
+    Songs are numbered by their order, and the numbering is printed with the paths.
+    """
+    sources = [gp_path for gp_path, _ in iter_sources(gp_paths)]
+    for song_id, gp_path in enumerate(sources):
+        print(song_id, gp_path)
+
+    songs = (guitarpro.parse(str(gp_path)) for gp_path in sources)
+    write_note_events(
+        songs, out_path, track_number=track_number if track_number >= 0 else None
+    )
+
+
+@app.command()
+def worker(
+    stdio: bool = typer.Option(False, "--stdio"),
+    cache_size: int = 16,
+):
+    """
+    Run a long-lived worker that renders newline-delimited JSON jobs.
+
+    Each job is a JSON object on its own line, with either a `path` or base64 `data`,
+    optional `tracks` (default [0]), optional `config` overrides and an optional `id`.
+    Each result is written as a single JSON line, in job order.
+    """
+    if not stdio:
+        raise typer.BadParameter("Only --stdio workers are supported.")
+
+    serve(sys.stdin, sys.stdout, cache_size=cache_size)
+
+
+def main():
+    app()
 
 
 if __name__ == "__main__":
-    typer.run(main)
+    main()
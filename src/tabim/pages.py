@@ -0,0 +1,265 @@
+"""
+Paginated output, with an index of where every page starts.
+
+The rendered measures are broken into systems (the lines of ``render_section``)
+once, and the height of every system is known before drawing it.
+Pages are then filled with whole systems, so that a system is never split
+across pages, and any single page can be drawn from the cached measures
+without drawing the pages before it.
+"""
+
+from __future__ import annotations
+
+import io
+from bisect import bisect_left
+from typing import Optional, Sequence
+
+import attr
+import guitarpro
+
+from tabim.config import LyricsPosition, RenderConfig, snapshot_config
+from tabim.song import (
+    LineCache,
+    formar_header,
+    get_tuning,
+    join_song,
+    less_naive_render_beats,
+    parse_song,
+    render_section,
+    split_lines,
+    split_sections,
+)
+from tabim.types import AsciiMeasure, Section
+from tabim.utils import strip_trailing_whitespace
+
+
+@attr.s(auto_attribs=True, frozen=True, slots=True)
+class System:
+    """
+    A single line of tab, as drawn by ``render_section``.
+
+    ``height`` includes the section title if the system opens its section,
+    and the empty line after the system.
+    """
+
+    section: int
+    first_measure: int
+    measures: Sequence[AsciiMeasure]
+    height: int
+    title_height: int = 0
+
+    @property
+    def opens_section(self) -> bool:
+        return self.title_height > 0
+
+
+@attr.s(auto_attribs=True, frozen=True, slots=True)
+class Page:
+    """
+    An entry of the page index.
+
+    ``first_measure`` and ``last_measure`` are 1-based bar numbers, and
+    ``sections`` are the indices of the sections with systems on the page.
+    """
+
+    first_system: int
+    n_systems: int
+    first_measure: int
+    last_measure: int
+    sections: tuple[int, ...]
+
+
+def get_system_height(
+    n_strings: int,
+    show_lyrics: bool = True,
+    bar_numbers: bool = True,
+    lyrics_position: LyricsPosition = LyricsPosition.Top,
+) -> int:
+    """
+    The number of text lines ``render_section`` uses for a line of tab,
+    including the empty line after it.
+    """
+    height = n_strings + int(show_lyrics) + 1
+    if bar_numbers:
+        height += 1
+        if lyrics_position == LyricsPosition.Bottom or not show_lyrics:
+            height += 1
+    return height
+
+
+def layout_systems(
+    sections: Sequence[Section],
+    line_length: int = 90,
+    system_height: int = 9,
+    show_section_headers: bool = True,
+) -> list[System]:
+    systems = []
+    for i_section, section in enumerate(sections):
+        first_measure = section.first_measure
+        for i_line, line in enumerate(split_lines(section.measures, line_length)):
+            # The title is followed by an empty line
+            title_height = 0
+            if i_line == 0 and show_section_headers and section.title:
+                title_height = 2
+            systems.append(
+                System(
+                    section=i_section,
+                    first_measure=first_measure,
+                    measures=line,
+                    height=system_height + title_height,
+                    title_height=title_height,
+                )
+            )
+            first_measure += len(line)
+    return systems
+
+
+def paginate(
+    systems: Sequence[System], page_height: int, first_page_offset: int = 0
+) -> list[Page]:
+    """
+    Fill pages of ``page_height`` lines with whole systems.
+
+    ``first_page_offset`` lines of the first page are taken by the song header.
+    A system taller than a page gets a page of its own.
+    """
+    pages = []
+    used = first_page_offset
+    first_system = 0
+    for i, system in enumerate(systems):
+        # The empty line after the last system of a page is not printed
+        if i > first_system and used + system.height - 1 > page_height:
+            pages.append(_make_page(systems, first_system, i))
+            first_system = i
+            used = 0
+        used += system.height
+
+    if systems:
+        pages.append(_make_page(systems, first_system, len(systems)))
+    return pages
+
+
+def _make_page(systems: Sequence[System], start: int, end: int) -> Page:
+    page_systems = systems[start:end]
+    last = page_systems[-1]
+    return Page(
+        first_system=start,
+        n_systems=end - start,
+        first_measure=page_systems[0].first_measure,
+        last_measure=last.first_measure + len(last.measures) - 1,
+        sections=tuple(sorted({system.section for system in page_systems})),
+    )
+
+
+class PaginatedSong:
+    """
+    A track of a song, rendered page by page.
+
+    ``pages`` is the page index, and ``render_page`` draws a single page.
+    Every page ends with a newline, and joining all the pages with another one
+    (an empty line between pages) gives the text of ``render_song``.
+    Unlike ``render_song``, an instance should not be used from several threads
+    at once, as pages share a cache of rendered lines.
+    """
+
+    def __init__(
+        self,
+        song: guitarpro.Song,
+        page_height: int,
+        track_number: int = 0,
+        config: Optional[RenderConfig] = None,
+    ):
+        config = snapshot_config(config)
+
+        track = song.tracks[track_number]
+        self.config = config
+        self.header = formar_header(song, config)
+        self.tuning = get_tuning(track.strings)
+
+        measures = less_naive_render_beats(
+            parse_song(song, track_number),
+            n_strings=len(track.strings),
+            cont_char="=" if config.line.show_cont else "-",
+        )
+        self.sections = split_sections(
+            measures=measures,
+            measure_headers=[measure.header for measure in track.measures],
+        )
+        self.systems = layout_systems(
+            self.sections,
+            line_length=config.line.line_length,
+            system_height=get_system_height(
+                n_strings=len(track.strings),
+                show_lyrics=config.line.show_lyrics,
+                bar_numbers=config.line.show_bar_numbers,
+                lyrics_position=config.line.lyrics_position,
+            ),
+        )
+        # The header is followed by an empty line
+        header_height = self.header.count("\n") + 2
+        empty_sections = sum(1 for section in self.sections if not section.measures)
+        self.pages = paginate(
+            self.systems,
+            page_height=page_height,
+            first_page_offset=header_height + empty_sections,
+        )
+        self._last_measures = [page.last_measure for page in self.pages]
+        self._line_cache: LineCache = {}
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def page_of_measure(self, measure: int) -> int:
+        """
+        The (0-based) page a (1-based) bar number is drawn on.
+        """
+        i = bisect_left(self._last_measures, measure)
+        if measure < 1 or i == len(self.pages):
+            raise IndexError(f"No such measure: {measure}")
+        return i
+
+    def render_page(self, number: int) -> str:
+        """
+        Draw a single page, numbered from 0.
+        """
+        page = self.pages[number]
+        systems = self.systems[page.first_system : page.first_system + page.n_systems]
+
+        line = self.config.line
+        output = io.StringIO()
+        first_section = 0 if number == 0 else page.sections[0]
+        for i_section in range(first_section, page.sections[-1] + 1):
+            section_systems = [
+                system for system in systems if system.section == i_section
+            ]
+            if not section_systems:
+                # An empty section still takes a line in ``render_song``
+                print(file=output)
+                continue
+            first_system = section_systems[0]
+            section = Section(
+                measures=[
+                    measure for system in section_systems for measure in system.measures
+                ],
+                first_measure=first_system.first_measure,
+                title=(
+                    self.sections[i_section].title
+                    if first_system.opens_section
+                    else None
+                ),
+            )
+            rendered_section = render_section(
+                section=section,
+                line_length=line.line_length,
+                tuning=self.tuning,
+                show_lyrics=line.show_lyrics,
+                bar_numbers=line.show_bar_numbers,
+                lyrics_position=line.lyrics_position,
+                line_cache=self._line_cache,
+            )
+            print(rendered_section, file=output)
+
+        body = strip_trailing_whitespace(output.getvalue())
+        if number == 0:
+            return join_song(self.header, body)
+        return body
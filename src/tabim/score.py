@@ -0,0 +1,234 @@
+"""
+Multi-track scores, with all tracks aligned on a shared beat grid.
+
+Each measure is laid out once for all tracks: the beat timestamps of all tracks
+are merged, and every timestamp gets a single width, wide enough for the notes
+of every track.
+A track with no beat at some timestamp sustains whatever it is playing across it.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Optional, Sequence
+
+import guitarpro
+
+from tabim.config import LyricsPosition, RenderConfig, snapshot_config
+from tabim.song import (
+    formar_header,
+    get_beat_extent,
+    get_tuning,
+    join_song,
+    parse_song,
+    render_beat_notes,
+    render_line,
+    render_measure_beats,
+    split_lines,
+    split_sections,
+)
+from tabim.types import AsciiMeasure, AsciiNote, Section, TabBeat, TabNote
+from tabim.utils import strip_trailing_whitespace
+
+
+def split_measures(tab: Sequence[TabBeat]) -> list[tuple[list[TabBeat], int]]:
+    """
+    Split ``parse_song`` output into the beats and end of each measure.
+    """
+    measures = []
+    beats: list[TabBeat] = []
+    for beat in tab:
+        if beat.is_measure_break:
+            measures.append((beats, beat.start))
+            beats = []
+        else:
+            beats.append(beat)
+    return measures
+
+
+def fill_beat(start: int, previous: Optional[TabBeat], n_strings: int) -> TabBeat:
+    """
+    Make a beat for a timestamp a track has no beat at.
+
+    Notes of the previous beat that are still sounding are sustained.
+    """
+    notes: list[Optional[TabNote]] = [None for _ in range(n_strings)]
+    if previous and not previous.is_rest:
+        for string, note in enumerate(previous.notes):
+            if note and note.note.beat.start + note.note.beat.duration.time > start:
+                notes[string] = TabNote(
+                    note=note.note, prev_note=note, chain=note.chain
+                )
+
+    if not any(notes):
+        return TabBeat.rest(start=start)
+    return TabBeat.from_notes(start=start, notes=notes, lyric="")
+
+
+def render_score_measure(
+    track_beats: Sequence[Sequence[TabBeat]],
+    end: int,
+    n_strings: Sequence[int],
+    cont_char="=",
+) -> list[AsciiMeasure]:
+    """
+    Draw the same measure of several tracks, aligned to each other.
+    """
+    timestamps = sorted({beat.start for beats in track_beats for beat in beats})
+
+    filled_beats = []
+    beat_notes = []
+    for beats, track_strings in zip(track_beats, n_strings):
+        by_start = {beat.start: beat for beat in beats}
+        filled: list[TabBeat] = []
+        ascii_notes: list[list[AsciiNote]] = []
+        for timestamp in timestamps:
+            beat = by_start.get(timestamp)
+            if beat is None:
+                # Sustained notes are never drawn, so there is nothing to render.
+                beat = fill_beat(
+                    timestamp, filled[-1] if filled else None, track_strings
+                )
+                ascii_notes.append([AsciiNote() for _ in range(track_strings)])
+            else:
+                ascii_notes.append(render_beat_notes(beat, n_strings=track_strings))
+            filled.append(beat)
+        filled_beats.append(filled)
+        beat_notes.append(ascii_notes)
+
+    extents = [(0, 0) for _ in timestamps]
+    for beats, notes in zip(filled_beats, beat_notes):
+        for i, (beat, ascii_notes) in enumerate(zip(beats, notes)):
+            head, tail = get_beat_extent(beat, ascii_notes)
+            extents[i] = (max(extents[i][0], head), max(extents[i][1], tail))
+
+    measures = []
+    for beats, notes, track_strings in zip(filled_beats, beat_notes, n_strings):
+        lyrics, strings = render_measure_beats(
+            beats,
+            n_strings=track_strings,
+            cont_char=cont_char,
+            beat_notes=notes,
+            extents=extents,
+        )
+        measures.append(
+            AsciiMeasure(
+                lyrics=lyrics, strings=strings, beat_starts=timestamps, end=end
+            )
+        )
+    return measures
+
+
+def render_score_section(
+    track_sections: Sequence[Section],
+    tunings: Sequence[Sequence[str]],
+    line_length: int = 90,
+    show_lyrics: bool = True,
+    bar_numbers: bool = True,
+    lyrics_position: LyricsPosition = LyricsPosition.Top,
+    show_section_headers: bool = True,
+) -> str:
+    """
+    Like ``render_section``, but draws a system of all tracks for every line.
+
+    Lyrics are only drawn for the first track.
+    """
+    first_section = track_sections[0]
+    line_lengths = [
+        len(line) for line in split_lines(first_section.measures, line_length)
+    ]
+
+    current_bar = first_section.first_measure
+    output = io.StringIO()
+
+    if show_section_headers and first_section.title:
+        print(f"[{first_section.title}]\n", file=output)
+
+    line_start = 0
+    for n_measures in line_lengths:
+        if bar_numbers:
+            print(current_bar, file=output)
+
+            if lyrics_position == LyricsPosition.Bottom or not show_lyrics:
+                print(file=output)
+
+        for i, (section, tuning) in enumerate(zip(track_sections, tunings)):
+            if i:
+                print(file=output)
+            rendered_line = render_line(
+                section.measures[line_start : line_start + n_measures],
+                show_lyrics=show_lyrics and i == 0,
+                tuning=tuning,
+                lyrics_position=lyrics_position,
+                n_string=len(tuning),
+            )
+            print(rendered_line, file=output)
+        print(file=output)
+
+        current_bar += n_measures
+        line_start += n_measures
+
+    return strip_trailing_whitespace(output.getvalue())
+
+
+def render_score(
+    song: guitarpro.Song,
+    track_numbers: Optional[Sequence[int]] = None,
+    config: Optional[RenderConfig] = None,
+) -> str:
+    """
+    Render several tracks of a song as aligned systems, one row per track.
+
+    Defaults to all tracks.
+    """
+    config = snapshot_config(config)
+    if track_numbers is None:
+        track_numbers = range(len(song.tracks))
+
+    tracks = [song.tracks[track_number] for track_number in track_numbers]
+    n_strings = [len(track.strings) for track in tracks]
+    cont_char = "=" if config.line.show_cont else "-"
+
+    track_measures = []
+    for i, track_number in enumerate(track_numbers):
+        tab = parse_song(song, track_number)
+        if i:
+            # Lyrics are only shown once, above the first track
+            for beat in tab:
+                beat.lyric = ""
+        track_measures.append(split_measures(tab))
+
+    measures: list[list[AsciiMeasure]] = [[] for _ in tracks]
+    for measure_parts in zip(*track_measures):
+        track_beats = [beats for beats, _ in measure_parts]
+        end = measure_parts[0][1]
+        for track_measure, measure in zip(
+            measures,
+            render_score_measure(track_beats, end, n_strings, cont_char=cont_char),
+        ):
+            track_measure.append(measure)
+
+    tunings = [get_tuning(track.strings) for track in tracks]
+    tuning_width = max(len(tuning[0]) for tuning in tunings)
+    tunings = [[note.ljust(tuning_width) for note in tuning] for tuning in tunings]
+
+    measure_headers = [measure.header for measure in tracks[0].measures]
+    track_sections = [
+        split_sections(measures=track_measures, measure_headers=measure_headers)
+        for track_measures in measures
+    ]
+
+    output = io.StringIO()
+    for sections in zip(*track_sections):
+        rendered_section = render_score_section(
+            sections,
+            tunings=tunings,
+            line_length=config.line.line_length,
+            show_lyrics=config.line.show_lyrics,
+            bar_numbers=config.line.show_bar_numbers,
+            lyrics_position=config.line.lyrics_position,
+        )
+        print(rendered_section, file=output)
+
+    body = strip_trailing_whitespace(output.getvalue())
+    return join_song(formar_header(song, config), body)
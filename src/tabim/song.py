@@ -2,19 +2,47 @@ from __future__ import annotations
 
 import io
 import re
-from functools import reduce
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial, reduce
 from itertools import chain, groupby, repeat
 from operator import attrgetter
-from typing import Iterator, Optional, Sequence, Any
+from typing import (
+    Any,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+)
 
 import guitarpro
 from more_itertools import chunked, interleave, windowed
 
-from tabim.config import LyricsPosition, RenderConfig
+from tabim.config import LyricsPosition, RenderConfig, snapshot_config
 from tabim.note import render_note
-from tabim.types import AsciiMeasure, TabBeat, TabNote, Section
+from tabim.types import (
+    AsciiMeasure,
+    AsciiNote,
+    Deadline,
+    Position,
+    PositionIndex,
+    Section,
+    TabBeat,
+    TabNote,
+    TieChain,
+)
 from tabim.utils import concat_columns, strip_trailing_whitespace, try_getattr, unnest
 
+# Ends a tab that was cut short by its deadline
+TRUNCATED_NOTICE = "[Truncated: rendering stopped at the deadline]"
+
+
+def is_expired(deadline: Optional[Deadline]) -> bool:
+    return deadline is not None and deadline.check()
+
 
 def get_measure_beats(measure: guitarpro.Measure) -> list[guitarpro.Beat]:
     beats = unnest(measure.voices, "beats")
@@ -74,100 +102,192 @@ def parse_song(song: guitarpro.Song, track_number: int = 0) -> Sequence[TabBeat]
     tab_beats = []
     live_notes: list[Optional[TabNote]] = [None for _ in track.strings]
     for measure in track.measures:
-        for timestamp, beats in get_grouped_beats(measure):
-            tie_live_notes = live_notes[:]
-            # Remove all ended live-notes
-            for string, note in enumerate(live_notes):
-                if not note:
-                    continue
-                if note.note.beat.start + note.note.beat.duration.time <= timestamp:
-                    live_notes[string] = None
-
-            # Collect new notes from current beats
-            notes: list[Optional[TabNote]] = [None for _ in track.strings]
-            new_live_notes = live_notes[:]
-            tie_notes = []
-            has_play = False  # Denotes whether any play-note was present in the beat
-            for beat in beats:
-                for note in beat.notes:
-                    if note.type == guitarpro.NoteType.tie:
-                        new_note = TabNote.tie(
-                            note, tie_note=tie_live_notes[note.string - 1]
-                        )
-                        tie_notes.append(new_note)
-                    else:
-                        new_note = TabNote.play(
-                            note, prev_note=tie_live_notes[note.string - 1]
-                        )
-                        has_play = True
-                    new_live_notes[note.string - 1] = new_note
-                    notes[note.string - 1] = new_note
-            if has_play:
-                for tie_note in tie_notes:
-                    tie_note.set_cont()
-
-            # Mark continuation for live notes
-            for string, (note, live_note) in enumerate(zip(notes, live_notes)):
-                if note:
-                    continue
-                if live_note and has_play:
-                    notes[string] = TabNote.cont(
-                        live_note.note, tie_live_notes[live_note.note.string - 1]
-                    )
-                    # Propagate cont
-                    live_note.set_cont()
+        measure_beats, live_notes = parse_measure(
+            measure, live_notes=live_notes, lyric_timestamps=lyric_timestamps
+        )
+        tab_beats.extend(measure_beats)
 
-            # Update live notes
-            live_notes = new_live_notes
+    return tab_beats
+
+
+def parse_measure(
+    measure: guitarpro.Measure,
+    live_notes: Sequence[Optional[TabNote]],
+    lyric_timestamps: Mapping[int, str],
+    source: Optional[Hashable] = None,
+    known_chains: Optional[Mapping[int, TieChain]] = None,
+) -> tuple[list[TabBeat], list[Optional[TabNote]]]:
+    """
+    Parse a single measure, as part of ``parse_song``.
 
-            tab_beats.append(
-                TabBeat.from_notes(
-                    notes=notes,
-                    lyric=lyric_timestamps.get(timestamp, ""),
-                    start=timestamp,
+    ``live_notes`` are the notes still live when the previous measure ended.
+    Returns the measure's beats, ending with a measure break, and the notes
+    still live at the end of this measure.
+
+    ``source`` is recorded as the reason for any continuation this measure
+    marks, and ``known_chains`` maps ``id(note)`` to a tie chain to reuse for
+    that note if it is played.
+    These are used to re-parse a measure in place, see ``tabim.incremental``.
+    """
+    if known_chains is None:
+        known_chains = {}
+
+    tab_beats = []
+    live_notes = list(live_notes)
+    n_strings = len(live_notes)
+
+    measure_beats = get_measure_beats(measure)
+    if not any(beat.notes for beat in measure_beats):
+        # Nothing is played, so we only need to expire the live notes.
+        timestamps = sorted({beat.start for beat in measure_beats})
+        for string, note in enumerate(live_notes):
+            if not note or not timestamps:
+                continue
+            if note.note.beat.start + note.note.beat.duration.time <= timestamps[-1]:
+                live_notes[string] = None
+        tab_beats.extend(
+            TabBeat.rest(start=timestamp, lyric=lyric_timestamps.get(timestamp, ""))
+            for timestamp in timestamps
+        )
+        tab_beats.append(TabBeat.measure(start=measure.end))
+        return tab_beats, live_notes
+
+    for timestamp, beats in groupby(measure_beats, key=attrgetter("start")):
+        tie_live_notes = live_notes[:]
+        # Remove all ended live-notes
+        for string, note in enumerate(live_notes):
+            if not note:
+                continue
+            if note.note.beat.start + note.note.beat.duration.time <= timestamp:
+                live_notes[string] = None
+
+        # Collect new notes from current beats
+        notes: list[Optional[TabNote]] = [None for _ in range(n_strings)]
+        new_live_notes = live_notes[:]
+        tie_notes = []
+        has_play = False  # Denotes whether any play-note was present in the beat
+        for beat in beats:
+            for note in beat.notes:
+                if note.type == guitarpro.NoteType.tie:
+                    new_note = TabNote.tie(
+                        note, tie_note=tie_live_notes[note.string - 1]
+                    )
+                    tie_notes.append(new_note)
+                else:
+                    new_note = TabNote.play(
+                        note,
+                        prev_note=tie_live_notes[note.string - 1],
+                        chain=known_chains.get(id(note)),
+                    )
+                    has_play = True
+                new_live_notes[note.string - 1] = new_note
+                notes[note.string - 1] = new_note
+        if has_play:
+            for tie_note in tie_notes:
+                tie_note.set_cont(source)
+
+        # Mark continuation for live notes
+        for string, (note, live_note) in enumerate(zip(notes, live_notes)):
+            if note:
+                continue
+            if live_note and has_play:
+                notes[string] = TabNote.cont(
+                    live_note.note, tie_live_notes[live_note.note.string - 1]
                 )
+                # Propagate cont
+                live_note.set_cont(source)
+
+        # Update live notes
+        live_notes = new_live_notes
+
+        tab_beats.append(
+            TabBeat.from_notes(
+                notes=notes,
+                lyric=lyric_timestamps.get(timestamp, ""),
+                start=timestamp,
             )
+        )
 
-        tab_beats.append(TabBeat.measure(start=measure.end))
+    tab_beats.append(TabBeat.measure(start=measure.end))
 
-    return tab_beats
+    return tab_beats, live_notes
 
 
-def less_naive_render_beats(
+@lru_cache(maxsize=None)
+def render_rest_measure(
+    n_beats: int, n_strings: int
+) -> tuple[tuple[str, ...], tuple[tuple[str, ...], ...]]:
+    """
+    Render the lyrics and strings of a measure of ``n_beats`` rest beats.
+
+    This is what ``render_measure_beats`` would draw for such a measure,
+    computed once per layout and shared between all matching measures.
+    The result is immutable, so it is safely shared between threads as well.
+    """
+    lyrics = tuple(" " * int(i == 0) + "   " for i in range(n_beats))
+    string = tuple("-" * (3 + int(i == 0)) for i in range(n_beats))
+    return lyrics, tuple(string for _ in range(n_strings))
+
+
+def render_beat_notes(beat: TabBeat, n_strings: int = 6) -> list[AsciiNote]:
+    if beat.is_rest:
+        return [AsciiNote() for _ in range(n_strings)]
+
+    return [
+        render_note(
+            note=try_getattr(note, "note"),
+            prev=try_getattr(note, "prev_note.note"),
+        )
+        for note in beat.notes
+    ]
+
+
+def get_beat_extent(beat: TabBeat, ascii_notes: Sequence[AsciiNote]) -> tuple[int, int]:
+    """
+    The widths needed before and after the start of the beat's notes.
+    """
+    max_head = max(len(note.head) for note in ascii_notes)
+    max_tail = max(
+        len(beat.lyric),
+        max(len(note.tail) for note in ascii_notes),
+    )
+    return max_head, max_tail
+
+
+def render_measure_beats(
     beats: Sequence[TabBeat],
     n_strings: int = 6,
     cont_char="=",
-) -> Sequence[AsciiMeasure]:
+    beat_notes: Optional[Sequence[Sequence[AsciiNote]]] = None,
+    extents: Optional[Sequence[tuple[int, int]]] = None,
+) -> tuple[list[str], list[list[str]]]:
+    """
+    Draw the beats of a single measure.
+
+    ``beat_notes`` and ``extents`` can be given to reuse the beats'
+    ``render_beat_notes`` or to override their ``get_beat_extent``,
+    for example to align several tracks.
+    """
     lyrics = []
     strings = [[] for _ in range(n_strings)]
 
-    measures: list[AsciiMeasure] = []
-
     measure_break_notes = [True for _ in range(n_strings)]
     first_beat_in_measure = True
 
-    for beat in beats:
-        if beat.is_measure_break:
-            measures.append(AsciiMeasure(lyrics=lyrics, strings=strings))
-            lyrics = []
-            strings = [[] for _ in range(n_strings)]
-            measure_break_notes = [True for _ in range(n_strings)]
-            first_beat_in_measure = True
-            continue
+    for i_beat, beat in enumerate(beats):
+        notes = beat.notes
+        if beat.is_rest:
+            notes = [None for _ in range(n_strings)]
 
-        ascii_notes = [
-            render_note(
-                note=try_getattr(note, "note"),
-                prev=try_getattr(note, "prev_note.note"),
-            )
-            for note in beat.notes
-        ]
+        if beat_notes is None:
+            ascii_notes = render_beat_notes(beat, n_strings=n_strings)
+        else:
+            ascii_notes = beat_notes[i_beat]
 
-        max_head = max(len(note.head) for note in ascii_notes)
-        max_tail = max(
-            len(beat.lyric),
-            max(len(note.tail) for note in ascii_notes),
-        )
+        if extents is None:
+            max_head, max_tail = get_beat_extent(beat, ascii_notes)
+        else:
+            max_head, max_tail = extents[i_beat]
 
         draw_width = max(3, max_head + max_tail + 1)
         draw_tail = draw_width - max_head
@@ -175,7 +295,7 @@ def less_naive_render_beats(
         lyrics.append(
             " " * (max_head + int(first_beat_in_measure)) + beat.lyric.ljust(draw_tail)
         )
-        for i, (note, ascii_note) in enumerate(zip(beat.notes, ascii_notes)):
+        for i, (note, ascii_note) in enumerate(zip(notes, ascii_notes)):
             # No note, so we just draw the empty state
             if not note:
                 strings[i].append("-" * (draw_width + int(first_beat_in_measure)))
@@ -212,6 +332,110 @@ def less_naive_render_beats(
 
         first_beat_in_measure = False
 
+    return lyrics, strings
+
+
+def render_tab_measure(
+    beats: Sequence[TabBeat],
+    end: int,
+    n_strings: int = 6,
+    cont_char="=",
+) -> AsciiMeasure:
+    if all(beat.is_rest and not beat.lyric for beat in beats):
+        lyrics, strings = render_rest_measure(len(beats), n_strings)
+    else:
+        lyrics, strings = render_measure_beats(
+            beats, n_strings=n_strings, cont_char=cont_char
+        )
+
+    return AsciiMeasure(
+        lyrics=lyrics,
+        strings=strings,
+        beat_starts=[beat.start for beat in beats],
+        end=end,
+    )
+
+
+def less_naive_render_beats(
+    beats: Sequence[TabBeat],
+    n_strings: int = 6,
+    cont_char="=",
+) -> Sequence[AsciiMeasure]:
+    measures: list[AsciiMeasure] = []
+    measure_beats: list[TabBeat] = []
+
+    for beat in beats:
+        if not beat.is_measure_break:
+            measure_beats.append(beat)
+            continue
+
+        measures.append(
+            render_tab_measure(
+                measure_beats,
+                end=beat.start,
+                n_strings=n_strings,
+                cont_char=cont_char,
+            )
+        )
+        measure_beats = []
+
+    return measures
+
+
+def render_track_measures(
+    song: guitarpro.Song,
+    track_number: int = 0,
+    cont_char="=",
+    deadline: Optional[Deadline] = None,
+) -> list[AsciiMeasure]:
+    """
+    Parse and draw the measures of a track, like ``parse_song`` followed by
+    ``less_naive_render_beats``.
+
+    A measure is drawn as soon as no later measure can change it, that is once
+    none of its tie chains is live anymore.
+    If the ``deadline`` expires, parsing stops, and the measures parsed so far
+    are drawn as if the track ended there.
+    """
+    track = song.tracks[track_number]
+    n_strings = len(track.strings)
+    lyric_timestamps = parse_lyrics(song.lyrics.lines[0], track)
+
+    def draw(beats: Sequence[TabBeat]) -> AsciiMeasure:
+        *measure_beats, measure_break = beats
+        return render_tab_measure(
+            measure_beats,
+            end=measure_break.start,
+            n_strings=n_strings,
+            cont_char=cont_char,
+        )
+
+    measures = []
+    # Parsed measures waiting to be drawn, with the chains they depend on
+    pending: deque[tuple[list[TabBeat], set[TieChain]]] = deque()
+    live_notes: list[Optional[TabNote]] = [None for _ in range(n_strings)]
+    for measure in track.measures:
+        if is_expired(deadline):
+            break
+
+        measure_beats, live_notes = parse_measure(
+            measure, live_notes=live_notes, lyric_timestamps=lyric_timestamps
+        )
+        chains = set()
+        for beat in measure_beats:
+            for note in beat.notes:
+                if note:
+                    chains.add(note.chain)
+                    if note.prev_note:
+                        chains.add(note.prev_note.chain)
+        pending.append((measure_beats, chains))
+
+        # Continuations are only ever marked on chains of live notes
+        live_chains = {note.chain for note in live_notes if note}
+        while pending and pending[0][1].isdisjoint(live_chains):
+            measures.append(draw(pending.popleft()[0]))
+
+    measures.extend(draw(beats) for beats, _ in pending)
     return measures
 
 
@@ -274,6 +498,40 @@ def render_line(
     )
 
 
+def index_line(
+    line: Sequence[AsciiMeasure],
+    index: PositionIndex,
+    line_number: int,
+    tuning_width: int,
+):
+    # Each measure is preceded by a single-column separator
+    column = tuning_width
+    for measure in line:
+        column += 1
+        measure_column = column
+        beat_ends = chain(measure.beat_starts[1:], [measure.end])
+        for start, end, lyric in zip(measure.beat_starts, beat_ends, measure.lyrics):
+            index.add_beat(
+                Position(
+                    start=start,
+                    end=end,
+                    line=line_number,
+                    column_start=column,
+                    column_end=column + len(lyric),
+                )
+            )
+            column += len(lyric)
+        index.add_measure(
+            Position(
+                start=measure.start,
+                end=measure.end,
+                line=line_number,
+                column_start=measure_column,
+                column_end=column,
+            )
+        )
+
+
 def split_sections(
     measures: Sequence[AsciiMeasure], measure_headers: Sequence[guitarpro.MeasureHeader]
 ):
@@ -301,19 +559,17 @@ def split_sections(
     return sections
 
 
-def render_section(
-    section: Section,
-    line_length: int = 90,
-    tuning: Sequence[str] = "EADGBe"[::-1],
-    show_lyrics: bool = True,
-    bar_numbers: bool = True,
-    lyrics_position: LyricsPosition = LyricsPosition.Top,
-    show_section_headers: bool = True,
-) -> str:
+# Rendered lines, keyed by the ids of their measures
+LineCache = MutableMapping[tuple[int, ...], tuple[Sequence[AsciiMeasure], str]]
+
+
+def split_lines(
+    measures: Sequence[AsciiMeasure], line_length: int = 90
+) -> list[list[AsciiMeasure]]:
     lines = []
     current_line = []
     current_line_length = 0
-    for measure in section.measures:
+    for measure in measures:
         current_line.append(measure)
         current_line_length += len(measure)
         if current_line_length > line_length:
@@ -324,25 +580,74 @@ def render_section(
     if current_line:
         lines.append(current_line)
 
+    return lines
+
+
+def render_section(
+    section: Section,
+    line_length: int = 90,
+    tuning: Sequence[str] = "EADGBe"[::-1],
+    show_lyrics: bool = True,
+    bar_numbers: bool = True,
+    lyrics_position: LyricsPosition = LyricsPosition.Top,
+    show_section_headers: bool = True,
+    index: Optional[PositionIndex] = None,
+    line_offset: int = 0,
+    line_cache: Optional[LineCache] = None,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    """
+    Render a section, breaking it up into lines.
+
+    Rendered lines are looked up in and added to ``line_cache``, if given.
+    If the ``deadline`` expires, the remaining lines are left out.
+    """
+    lines = split_lines(section.measures, line_length=line_length)
+
     current_bar = section.first_measure
     output = io.StringIO()
+    # Only tracked for the index
+    line_number = line_offset
 
     if show_section_headers and section.title:
         print(f"[{section.title}]\n", file=output)
+        line_number += 2
 
     for line in lines:
-        rendered_line = render_line(
-            line,
-            show_lyrics=show_lyrics,
-            tuning=tuning,
-            lyrics_position=lyrics_position,
-        )
+        if is_expired(deadline):
+            break
+
+        cache_key = tuple(map(id, line))
+        if line_cache is not None and cache_key in line_cache:
+            rendered_line = line_cache[cache_key][1]
+        else:
+            rendered_line = render_line(
+                line,
+                show_lyrics=show_lyrics,
+                tuning=tuning,
+                lyrics_position=lyrics_position,
+            )
+            if line_cache is not None:
+                # Keep the measures alive, so that their ids are not reused
+                line_cache[cache_key] = (line, rendered_line)
 
         if bar_numbers:
             print(current_bar, file=output)
+            line_number += 1
 
             if lyrics_position == LyricsPosition.Bottom or not show_lyrics:
                 print(file=output)
+                line_number += 1
+
+        if index is not None:
+            index_line(
+                line,
+                index=index,
+                line_number=line_number,
+                tuning_width=len(tuning[0]),
+            )
+            # The line is followed by an empty line
+            line_number += rendered_line.count("\n") + 2
 
         print(rendered_line, file=output)
         print(file=output)
@@ -360,6 +665,9 @@ def render_measures(
     bar_numbers: bool = True,
     lyrics_position: LyricsPosition = LyricsPosition.Top,
     measure_headers: Optional[Sequence[guitarpro.MeasureHeader]] = None,
+    index: Optional[PositionIndex] = None,
+    line_offset: int = 0,
+    deadline: Optional[Deadline] = None,
 ) -> str:
     if measure_headers:
         sections = split_sections(measures=measures, measure_headers=measure_headers)
@@ -367,8 +675,13 @@ def render_measures(
         sections = [Section.make_single(measures)]
 
     output = io.StringIO()
+    # Only tracked for the index
+    line_number = line_offset
 
     for section in sections:
+        if is_expired(deadline):
+            break
+
         rendered_section = render_section(
             section=section,
             line_length=line_length,
@@ -376,8 +689,13 @@ def render_measures(
             show_lyrics=show_lyrics,
             bar_numbers=bar_numbers,
             lyrics_position=lyrics_position,
+            index=index,
+            line_offset=line_number,
+            deadline=deadline,
         )
         print(rendered_section, file=output)
+        if index is not None:
+            line_number += rendered_section.count("\n") + 1
 
     return strip_trailing_whitespace(output.getvalue())
 
@@ -401,17 +719,38 @@ def render_song(
     song: guitarpro.Song,
     track_number: int = 0,
     config: Optional[RenderConfig] = None,
+    index: Optional[PositionIndex] = None,
+    deadline: Optional[Deadline] = None,
 ) -> str:
-    if config is None:
-        config = RenderConfig()
+    """
+    Render a track of the song as ASCII tab.
+
+    If ``index`` is given, it is filled with the position of every beat and
+    measure in the returned text, keyed by their start tick.
+
+    If ``deadline`` is given, rendering stops cooperatively once it expires,
+    between measures, sections or lines.
+    What was rendered so far is returned, ending with ``TRUNCATED_NOTICE``.
+
+    Rendering is reentrant: the song is only read, the config is copied on entry,
+    and all intermediate state is local to the call.
+    The same song and config can therefore be rendered on several threads at once.
+    """
+    config = snapshot_config(config)
+
+    header = formar_header(song, config)
 
-    tab = parse_song(song, track_number)
     cont_char = "=" if config.line.show_cont else "-"
-    measures = less_naive_render_beats(
-        tab,
-        n_strings=len(song.tracks[track_number].strings),
-        cont_char=cont_char,
+    measures = render_track_measures(
+        song, track_number=track_number, cont_char=cont_char, deadline=deadline
     )
+    if is_expired(deadline):
+        # Laying out is cheap next to parsing and drawing,
+        # so all the measures drawn in time are laid out,
+        # even if the deadline passed while drawing the last of them.
+        layout_deadline = None
+    else:
+        layout_deadline = deadline
     tuning = get_tuning(song.tracks[track_number].strings)
 
     body = render_measures(
@@ -424,10 +763,47 @@ def render_song(
         measure_headers=[
             measure.header for measure in song.tracks[track_number].measures
         ],
+        index=index,
+        # The header is followed by an empty line
+        line_offset=header.count("\n") + 2,
+        deadline=layout_deadline,
     )
 
-    header = formar_header(song, config)
+    if deadline is not None and deadline.expired:
+        body = "\n\n".join(filter(None, [body.rstrip(), TRUNCATED_NOTICE]))
+
+    return join_song(header, body)
+
+
+def render_many(
+    songs: Iterable[guitarpro.Song],
+    track_number: int = 0,
+    config: Optional[RenderConfig] = None,
+    max_workers: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+) -> list[str]:
+    """
+    Render many songs on a thread pool, returning the tabs in the order of ``songs``.
+
+    All songs are rendered with the same snapshot of ``config``, and share
+    the ``deadline``.
+    """
+    config = snapshot_config(config)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                partial(
+                    render_song,
+                    track_number=track_number,
+                    config=config,
+                    deadline=deadline,
+                ),
+                songs,
+            )
+        )
+
 
+def join_song(header: str, body: str) -> str:
     output = io.StringIO()
 
     print(header, file=output)
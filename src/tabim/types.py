@@ -1,25 +1,51 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence
+import time
+from bisect import bisect_right
+from typing import Hashable, Optional, Sequence
 
 import attr
 import guitarpro
 
 
+@attr.s(auto_attribs=True, slots=True, eq=False)
+class TieChain:
+    """
+    State shared by a note and all the notes tied to it.
+
+    The chain is continued once anything marks it so.
+    The markers are kept so that their marks can be retracted when re-parsing.
+    """
+
+    root: guitarpro.Note
+    cont_sources: set[Hashable] = attr.Factory(set)
+
+    @property
+    def is_cont(self):
+        return bool(self.cont_sources)
+
+
+def _make_chain(tab_note: TabNote) -> TieChain:
+    if tab_note.tie_note:
+        return tab_note.tie_note.chain
+    return TieChain(root=tab_note.note)
+
+
 @attr.s(auto_attribs=True)
 class TabNote:
     note: guitarpro.Note
     prev_note: Optional[TabNote]
     is_play: bool = False
-    is_cont: bool = False
     tie_note: Optional[TabNote] = None
+    chain: TieChain = attr.Factory(_make_chain, takes_self=True)
 
     @property
     def fret(self):
-        cur = self
-        while cur.tie_note:
-            cur = cur.tie_note
-        return cur.note.value
+        return self.chain.root.value
+
+    @property
+    def is_cont(self):
+        return self.chain.is_cont
 
     @property
     def is_tie(self):
@@ -27,12 +53,17 @@ class TabNote:
 
     @staticmethod
     def play(
-        note: guitarpro.Note, prev_note: Optional[guitarpro.Note] = None
+        note: guitarpro.Note,
+        prev_note: Optional[guitarpro.Note] = None,
+        chain: Optional[TieChain] = None,
     ) -> TabNote:
+        if chain is None:
+            chain = TieChain(root=note)
         return TabNote(
             note=note,
             is_play=True,
             prev_note=prev_note,
+            chain=chain,
         )
 
     @staticmethod
@@ -41,8 +72,8 @@ class TabNote:
     ) -> TabNote:
         return TabNote(
             note=note,
-            is_cont=True,
             prev_note=prev_note,
+            chain=TieChain(root=note, cont_sources={None}),
         )
 
     @staticmethod
@@ -50,22 +81,16 @@ class TabNote:
         note: guitarpro.Note,
         tie_note: TabNote,
     ) -> TabNote:
-        # Propagate cont
+        # Joins the chain of the tied note, so cont is shared along it
         return TabNote(
             note=note,
             tie_note=tie_note,
-            is_cont=tie_note.is_cont,
             prev_note=tie_note,
         )
 
-    def set_cont(self):
-        self.is_cont = True
-
-        # Propagate up tie-notes!
-        tie_note = self.tie_note
-        while tie_note:
-            tie_note.is_cont = True
-            tie_note = tie_note.tie_note
+    def set_cont(self, source: Optional[Hashable] = None):
+        # Applies to the entire tie chain
+        self.chain.cont_sources.add(source)
 
 
 @attr.s(auto_attribs=True)
@@ -86,11 +111,23 @@ class TabBeat:
     def measure(start: int) -> TabBeat:
         return TabBeat(is_measure_break=True, start=start)
 
+    @staticmethod
+    def rest(start: int, lyric: str = "") -> TabBeat:
+        return TabBeat(is_rest=True, lyric=lyric, start=start)
+
 
 @attr.s(auto_attribs=True, slots=True)
 class AsciiMeasure:
     lyrics: Sequence[str]
     strings: Sequence[Sequence[str]]
+    beat_starts: Sequence[int] = ()
+    end: int = 0
+
+    @property
+    def start(self):
+        if self.beat_starts:
+            return self.beat_starts[0]
+        return self.end
 
     @property
     def width(self):
@@ -123,3 +160,78 @@ class Section:
     @staticmethod
     def make_single(measures: Sequence[AsciiMeasure]) -> Section:
         return Section(measures=measures, first_measure=1, title=None)
+
+
+@attr.s(auto_attribs=True, frozen=True, slots=True)
+class Position:
+    start: int
+    end: int
+    line: int
+    column_start: int
+    column_end: int
+
+
+@attr.s(auto_attribs=True)
+class PositionIndex:
+    """
+    Maps ticks to their location in the rendered text.
+
+    ``line`` is the first text line of the system a beat or measure is drawn in,
+    and the column range is half-open, as in slicing.
+    """
+
+    beats: list[Position] = attr.Factory(list)
+    measures: list[Position] = attr.Factory(list)
+    _beat_starts: list[int] = attr.Factory(list)
+    _measure_starts: list[int] = attr.Factory(list)
+
+    def add_beat(self, position: Position):
+        self.beats.append(position)
+        self._beat_starts.append(position.start)
+
+    def add_measure(self, position: Position):
+        self.measures.append(position)
+        self._measure_starts.append(position.start)
+
+    @staticmethod
+    def _lookup(
+        positions: Sequence[Position], starts: Sequence[int], tick: int
+    ) -> Optional[Position]:
+        i = bisect_right(starts, tick) - 1
+        if i < 0:
+            return None
+        position = positions[i]
+        if tick >= position.end:
+            return None
+        return position
+
+    def beat_at(self, tick: int) -> Optional[Position]:
+        return self._lookup(self.beats, self._beat_starts, tick)
+
+    def measure_at(self, tick: int) -> Optional[Position]:
+        return self._lookup(self.measures, self._measure_starts, tick)
+
+
+@attr.s(auto_attribs=True, slots=True)
+class Deadline:
+    """
+    A point in time, on the ``time.monotonic`` clock, for rendering to stop at.
+
+    Once the deadline has passed it stays expired, so that every later
+    stage of rendering stops as well.
+    """
+
+    at: float
+    expired: bool = False
+
+    @staticmethod
+    def after(seconds: float) -> Deadline:
+        return Deadline(at=time.monotonic() + seconds)
+
+    def check(self) -> bool:
+        """
+        Return whether the deadline has passed.
+        """
+        if not self.expired and time.monotonic() >= self.at:
+            self.expired = True
+        return self.expired
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import traceback
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Optional
+
+import guitarpro
+
+from tabim.config import config_from_dict
+from tabim.song import render_song
+from tabim.types import Deadline
+
+
+class SongCache:
+    """
+    A small LRU cache of parsed songs, keyed by the hash of their content.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self._songs: OrderedDict[str, guitarpro.Song] = OrderedDict()
+
+    def parse(self, data: bytes) -> guitarpro.Song:
+        key = hashlib.sha256(data).hexdigest()
+        song = self._songs.get(key)
+        if song is not None:
+            self._songs.move_to_end(key)
+            return song
+
+        song = guitarpro.parse(io.BytesIO(data))
+        if self.max_size > 0:
+            self._songs[key] = song
+            if len(self._songs) > self.max_size:
+                self._songs.popitem(last=False)
+        return song
+
+
+def _read_job_data(job: dict[str, Any]) -> bytes:
+    if "data" in job:
+        return base64.b64decode(job["data"])
+    if "path" in job:
+        return Path(job["path"]).read_bytes()
+    raise ValueError("A job must have either a `path` or base64 `data`.")
+
+
+def run_job(job: dict[str, Any], cache: SongCache) -> dict[str, Any]:
+    """
+    Render a single job.
+
+    A job is a mapping with the following keys:
+
+        * ``path`` or ``data`` - the Guitar Pro file, or its base64 encoded content
+        * ``tracks`` - the track numbers to render, defaults to ``[0]``
+        * ``config`` - ``RenderConfig`` overrides, as accepted by ``config_from_dict``
+        * ``timeout`` - optional, seconds to spend on each track, after which
+          the tab is cut off and its result is marked as ``truncated``
+        * ``id`` - optional, echoed back in the result
+    """
+    song = cache.parse(_read_job_data(job))
+    config = config_from_dict(job.get("config", {}))
+    tracks = job.get("tracks", [0])
+    timeout = job.get("timeout")
+
+    tabs = []
+    for track_number in tracks:
+        deadline = None if timeout is None else Deadline.after(timeout)
+        tab: dict[str, Any] = {
+            "track_number": track_number,
+            "tab": render_song(
+                song, track_number=track_number, config=config, deadline=deadline
+            ),
+        }
+        if deadline is not None:
+            tab["truncated"] = deadline.expired
+        tabs.append(tab)
+
+    return {"id": job.get("id"), "ok": True, "tabs": tabs}
+
+
+def _error_result(job_id: Optional[Any], error: Exception) -> dict[str, Any]:
+    return {
+        "id": job_id,
+        "ok": False,
+        "error": {
+            "type": type(error).__name__,
+            "message": str(error),
+            "traceback": traceback.format_exc(),
+        },
+    }
+
+
+def serve(
+    input_stream: IO[str],
+    output_stream: IO[str],
+    cache_size: int = 16,
+):
+    """
+    Read newline-delimited JSON jobs and write one JSON result line per job.
+
+    Errors are reported per job, so that a bad job never stops the worker.
+    Results are flushed as soon as they are ready.
+    """
+    cache = SongCache(max_size=cache_size)
+
+    for line in input_stream:
+        if not line.strip():
+            continue
+
+        job_id = None
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("A job must be a JSON object.")
+            job_id = job.get("id")
+            result = run_job(job, cache)
+        except Exception as e:
+            result = _error_result(job_id, e)
+
+        output_stream.write(json.dumps(result) + "\n")
+        output_stream.flush()
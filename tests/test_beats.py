@@ -12,10 +12,11 @@ from tabim.song import (
     less_naive_render_beats,
     parse_song,
     render_measure,
+    render_measure_beats,
     render_measures,
     render_song,
 )
-from tabim.types import AsciiMeasure
+from tabim.types import AsciiMeasure, PositionIndex
 from tabim.utils import strip_trailing_whitespace
 
 
@@ -85,3 +86,68 @@ def test_render_full(verify_tab, sample, line_length):
     config = RenderConfig()
     config.line.lyrics_position = LyricsPosition.Top
     verify_tab(render_song(song, config=config))
+
+
+@pytest.mark.parametrize(
+    "sample",
+    [
+        "BeautyAndTheBeast.gp5",
+        "DifferentNotes.gp5",
+        "CarpetOfTheSun.gp5",
+        "NoteEffects.gp5",
+    ],
+)
+def test_position_index(sample):
+    with get_sample(sample).open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    index = PositionIndex()
+    lines = render_song(song, index=index).splitlines()
+
+    assert len(index.measures) == len(song.tracks[0].measures)
+    for measure in index.measures:
+        # Lyrics are on top, so the first string is one line down
+        string_line = lines[measure.line + 1]
+        assert string_line[measure.column_start - 1] == "|"
+        assert string_line[measure.column_end] == "|"
+        assert index.measure_at(measure.start) == measure
+        assert index.measure_at(measure.end - 1) == measure
+
+    for beat in index.beats:
+        assert index.beat_at(beat.start) == beat
+        measure = index.measure_at(beat.start)
+        assert measure.line == beat.line
+        assert measure.column_start <= beat.column_start < beat.column_end
+        assert beat.column_end <= measure.column_end
+
+    assert index.beat_at(index.beats[0].start - 1) is None
+    assert index.beat_at(index.beats[-1].end) is None
+
+
+def test_rest_measures():
+    with get_sample("CarpetOfTheSun.gp5").open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    track = song.tracks[0]
+    n_strings = len(track.strings)
+    rest_measures = [1, 2, 3, 5]
+    for i in rest_measures:
+        for voice in track.measures[i].voices:
+            for beat in voice.beats:
+                beat.notes = []
+
+    tab = parse_song(song, 0)
+    measures = less_naive_render_beats(tab, n_strings=n_strings)
+
+    measure_beats = [[]]
+    for beat in tab:
+        if beat.is_measure_break:
+            measure_beats.append([])
+        else:
+            measure_beats[-1].append(beat)
+
+    for i, (measure, beats) in enumerate(zip(measures, measure_beats)):
+        assert all(beat.is_rest for beat in beats) == (i in rest_measures)
+        lyrics, strings = render_measure_beats(beats, n_strings=n_strings)
+        assert list(measure.lyrics) == lyrics
+        assert [list(string) for string in measure.strings] == strings
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from tabim.bundle import (
+    MANIFEST_NAME,
+    Bundle,
+    BundleFormat,
+    Compression,
+    Manifest,
+    guess_bundle_format,
+    read_json_lines_bundle,
+)
+from tabim.config import RenderConfig
+
+TABS = {"first.tab": "e|-0-|\n", "nested/second.tab": "e|-1-|\n"}
+
+
+def _write_bundle(path, bundle_format, compression):
+    config = RenderConfig()
+    with Bundle(path, bundle_format, compression) as bundle:
+        for i, (name, tab) in enumerate(TABS.items()):
+            bundle.add(
+                tab,
+                Manifest.make(
+                    name=name,
+                    source=f"{name}.gp5",
+                    source_hash=str(i),
+                    track_number=i,
+                    config=config,
+                ),
+            )
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_zip_bundle(tmp_path, compression):
+    path = tmp_path / "bundle.zip"
+    _write_bundle(path, BundleFormat.Zip, compression)
+
+    with zipfile.ZipFile(path) as archive:
+        for name, tab in TABS.items():
+            assert archive.read(name).decode() == tab
+        manifest = archive.read(MANIFEST_NAME).decode().splitlines()
+
+    assert [json.loads(line)["name"] for line in manifest] == list(TABS)
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_tar_bundle(tmp_path, compression):
+    path = tmp_path / "bundle.tar"
+    _write_bundle(path, BundleFormat.Tar, compression)
+
+    with tarfile.open(path) as archive:
+        for name, tab in TABS.items():
+            assert archive.extractfile(name).read().decode() == tab
+        manifest = archive.extractfile(MANIFEST_NAME).read().decode().splitlines()
+
+    assert [json.loads(line)["track_number"] for line in manifest] == [0, 1]
+
+
+@pytest.mark.parametrize(
+    "suffix, compression",
+    [
+        (".jsonl", Compression.No),
+        (".jsonl.gz", Compression.Gzip),
+        (".jsonl.bz2", Compression.Bzip2),
+        (".jsonl.xz", Compression.Xz),
+    ],
+)
+def test_json_lines_bundle(tmp_path, suffix, compression):
+    path = tmp_path / f"bundle{suffix}"
+    assert guess_bundle_format(path) == (BundleFormat.JsonLines, compression)
+    _write_bundle(path, BundleFormat.JsonLines, compression)
+
+    lines = list(read_json_lines_bundle(path))
+    assert {line["name"]: line["tab"] for line in lines} == TABS
+    assert lines[0]["config"]["line"]["line_length"] == 60
+
+
+@pytest.mark.parametrize("bundle_format", list(BundleFormat))
+def test_bundle_names_and_errors(tmp_path, bundle_format):
+    path = tmp_path / "bundle"
+    config = RenderConfig()
+
+    def manifest(name, error=None):
+        return Manifest.make(
+            name=name,
+            source=name,
+            source_hash="",
+            track_number=0,
+            config=config,
+            error=error,
+        )
+
+    with Bundle(path, bundle_format) as bundle:
+        names = [
+            bundle.add("a", manifest("x.tab")).name,
+            bundle.add("b", manifest("x.tab")).name,
+            bundle.add_error(manifest("x.tab", error="ValueError()")).name,
+            bundle.add("c", manifest(MANIFEST_NAME)).name,
+        ]
+
+    assert names == ["x.tab", "x-2.tab", "x-3.tab", "MANIFEST-2.jsonl"]
+
+    if bundle_format == BundleFormat.JsonLines:
+        lines = list(read_json_lines_bundle(path))
+        assert [line["tab"] for line in lines] == ["a", "b", None, "c"]
+        assert lines[2]["error"] == "ValueError()"
+    elif bundle_format == BundleFormat.Zip:
+        with zipfile.ZipFile(path) as archive:
+            assert sorted(archive.namelist()) == sorted(
+                ["x.tab", "x-2.tab", "MANIFEST-2.jsonl", MANIFEST_NAME]
+            )
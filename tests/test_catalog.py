@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import shutil
+
+from tests.conftest import get_sample
+
+from tabim.catalog import ParseStatus, open_catalog, query_catalog, update_catalog
+
+
+def test_update_catalog(tmp_path):
+    root = tmp_path / "songs"
+    root.mkdir()
+    for sample in ["CarpetOfTheSun.gp5", "BeautyAndTheBeast.gp5", "TieNote.gp5"]:
+        shutil.copy(get_sample(sample), root / sample)
+
+    with open_catalog(tmp_path / "catalog.db") as connection:
+        stats = update_catalog(connection, [root])
+        assert (stats.added, stats.unchanged) == (3, 0)
+
+        stats = update_catalog(connection, [root])
+        assert (stats.added, stats.unchanged) == (0, 3)
+
+        shutil.copy(get_sample("DifferentNotes.gp5"), root / "TieNote.gp5")
+        (root / "BeautyAndTheBeast.gp5").unlink()
+        stats = update_catalog(connection, [root])
+        assert (stats.updated, stats.unchanged, stats.removed) == (1, 1, 1)
+
+        assert query_catalog(connection, artist="renaissance") == [
+            str((root / "CarpetOfTheSun.gp5").resolve())
+        ]
+        assert query_catalog(connection, section="Chorus") == [
+            str((root / "CarpetOfTheSun.gp5").resolve())
+        ]
+        assert len(query_catalog(connection, tuning="e B G D A E")) == 2
+        assert query_catalog(connection, title="Beauty and The Beast") == []
+
+
+def test_broken_files(tmp_path):
+    root = tmp_path / "songs"
+    root.mkdir()
+    shutil.copy(get_sample("TieNote.gp5"), root / "TieNote.gp5")
+    broken = root / "broken.gp5"
+    broken.write_bytes(b"not a guitar pro file")
+
+    with open_catalog(tmp_path / "catalog.db") as connection:
+        stats = update_catalog(connection, [root])
+        assert (stats.added, stats.failed) == (1, 1)
+
+        # Broken files are only read again once they change
+        stats = update_catalog(connection, [root])
+        assert (stats.failed, stats.unchanged) == (0, 2)
+
+        assert query_catalog(connection, status=ParseStatus.Error) == [
+            str(broken.resolve())
+        ]
+        assert query_catalog(connection, status=ParseStatus.Ok) == [
+            str((root / "TieNote.gp5").resolve())
+        ]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import copy
+import time
+
+import guitarpro
+import pytest
+from tests.conftest import get_sample
+
+from tabim.song import TRUNCATED_NOTICE, render_song
+from tabim.types import Deadline
+
+
+def _parse(sample) -> guitarpro.Song:
+    with get_sample(sample).open("rb") as stream:
+        return guitarpro.parse(stream)
+
+
+def _make_huge_song(sample, repeats: int) -> guitarpro.Song:
+    """
+    Play the first track of the sample ``repeats`` times in a row.
+    """
+    song = _parse(sample)
+    track = song.tracks[0]
+    headers = list(song.measureHeaders)
+    measures = list(track.measures)
+    song_length = headers[-1].start + headers[-1].length - headers[0].start
+
+    for repeat in range(1, repeats):
+        for header, measure in zip(headers, measures):
+            new_header = copy.copy(header)
+            new_header.start += repeat * song_length
+            new_header.number += repeat * len(headers)
+            new_measure = copy.deepcopy(
+                measure, {id(track): track, id(header): new_header}
+            )
+            for voice in new_measure.voices:
+                for beat in voice.beats:
+                    beat.start += repeat * song_length
+            song.measureHeaders.append(new_header)
+            track.measures.append(new_measure)
+
+    return song
+
+
+@pytest.mark.parametrize(
+    "sample", ["CarpetOfTheSun.gp5", "BeautyAndTheBeast.gp5", "NoteEffects.gp5"]
+)
+def test_deadline_not_reached(sample):
+    song = _parse(sample)
+    deadline = Deadline.after(3600)
+    assert render_song(song, deadline=deadline) == render_song(song)
+    assert not deadline.expired
+
+
+def test_expired_deadline():
+    song = _parse("CarpetOfTheSun.gp5")
+    deadline = Deadline(at=0)
+    tab = render_song(song, deadline=deadline)
+
+    assert deadline.expired
+    assert tab.endswith(TRUNCATED_NOTICE)
+    assert "|" not in tab
+
+
+def test_huge_song():
+    song = _make_huge_song("CarpetOfTheSun.gp5", repeats=40)
+    full_lines = render_song(song).splitlines()
+
+    budget = 0.05
+    start = time.monotonic()
+    deadline = Deadline.after(budget)
+    lines = render_song(song, deadline=deadline).splitlines()
+    elapsed = time.monotonic() - start
+
+    assert deadline.expired
+    assert elapsed < budget + 0.5
+    assert lines[-1] == TRUNCATED_NOTICE
+    assert len(lines) < len(full_lines)
+
+    # Everything but the last line of tab, which may hold fewer measures,
+    # is the same as in the full tab.
+    last_bar = max(i for i, line in enumerate(lines) if line.isdigit())
+    assert lines[:last_bar] == full_lines[:last_bar]
+
+
+def test_deadline_after_drawing(monkeypatch):
+    song = _parse("CarpetOfTheSun.gp5")
+    n_measures = len(song.tracks[0].measures)
+
+    # The clock passes the deadline right after the last measure is drawn,
+    # as the track is parsed with one check per measure.
+    ticks = iter(range(10**6))
+    monkeypatch.setattr(time, "monotonic", lambda: 0 if next(ticks) < n_measures else 2)
+    deadline = Deadline(at=1)
+    tab = render_song(song, deadline=deadline)
+
+    assert deadline.expired
+    assert tab.endswith(TRUNCATED_NOTICE)
+    assert tab[: -len(TRUNCATED_NOTICE)].rstrip() == render_song(song).rstrip()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import guitarpro
+import pytest
+from tests.conftest import get_sample
+
+from tabim.export import (
+    NOTE_EVENT_COLUMNS,
+    NoteEffect,
+    NoteEventKind,
+    iter_note_events,
+    note_events_array,
+    note_events_table,
+    write_note_events,
+)
+from tabim.song import parse_song
+
+SAMPLES = ["CarpetOfTheSun.gp5", "TieNote.gp5", "NoteEffects.gp5"]
+
+
+def _load(*samples: str) -> list[guitarpro.Song]:
+    return [guitarpro.parse(str(get_sample(sample))) for sample in samples]
+
+
+def test_iter_note_events():
+    (song,) = _load("TieNote.gp5")
+    events = list(iter_note_events(song))
+
+    tab_notes = [note for beat in parse_song(song) for note in beat.notes if note]
+    assert len(events) == len(tab_notes)
+    assert all(len(event) == len(NOTE_EVENT_COLUMNS) for event in events)
+
+    # Ties sound the fret of the note they are tied to
+    kinds = {event[7] for event in events}
+    assert NoteEventKind.Tie in kinds
+    assert {event[6] for event in events} == {4}
+
+
+def test_note_events_array():
+    numpy = pytest.importorskip("numpy")
+    songs = _load(*SAMPLES)
+
+    events = note_events_array(songs)
+    assert len(events) == sum(len(list(iter_note_events(song))) for song in songs)
+    assert list(numpy.unique(events["song_id"])) == [0, 1, 2]
+
+    hammers = events[(events["effects"] & NoteEffect.Hammer) != 0]
+    assert 2 in set(hammers["song_id"])
+
+
+def test_note_events_parquet(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    songs = _load(*SAMPLES)
+    path = tmp_path / "events.parquet"
+    write_note_events(songs, path)
+
+    table = pyarrow.parquet.read_table(path)
+    assert table.equals(note_events_table(songs))
+    assert numpy.array_equal(
+        table.column("fret").to_numpy(), note_events_array(songs)["fret"]
+    )
+
+
+@pytest.mark.parametrize("sample", ["CarpetOfTheSun.gp5", "BasicSustain.gp5"])
+def test_cont_events(sample):
+    (song,) = _load(sample)
+    events = list(iter_note_events(song))
+    assert any(event[7] == NoteEventKind.Cont for event in events)
+
+    # The rows of a note split its duration between them
+    note_durations = [
+        note.beat.duration.time
+        for measure in song.tracks[0].measures
+        for voice in measure.voices
+        for beat in voice.beats
+        for note in beat.notes
+    ]
+    assert sum(event[4] for event in events) == sum(note_durations)
+
+    # Continuations pick up where the previous row on the string stopped
+    ends = {}
+    for event in events:
+        _, _, _, start, duration, string, _, kind, _, effects, velocity = event
+        assert duration > 0
+        if kind == NoteEventKind.Cont:
+            assert (effects, velocity) == (0, 0)
+            assert ends[string] == start
+        ends[string] = start + duration
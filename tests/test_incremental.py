@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import random
+
+import guitarpro
+import pytest
+from tests.conftest import get_sample
+
+from tabim.incremental import IncrementalRender
+from tabim.song import render_song
+
+
+def _edit_note(rng: random.Random, note: guitarpro.Note):
+    """
+    Apply a random edit to the note, returning a function that undoes it.
+    """
+    value, note_type = note.value, note.type
+
+    def undo():
+        note.value, note.type = value, note_type
+
+    edit = rng.randrange(3)
+    if edit == 0:
+        note.value = rng.randrange(13)
+    elif edit == 1:
+        note.type = (
+            guitarpro.NoteType.dead
+            if note.type == guitarpro.NoteType.normal
+            else guitarpro.NoteType.normal
+        )
+    else:
+        note.type = (
+            guitarpro.NoteType.tie
+            if note.type == guitarpro.NoteType.normal
+            else guitarpro.NoteType.normal
+        )
+    return undo
+
+
+def _clear_beat(beat: guitarpro.Beat):
+    notes = beat.notes
+
+    def undo():
+        beat.notes = notes
+
+    beat.notes = []
+    return undo
+
+
+@pytest.mark.parametrize(
+    "sample", ["CarpetOfTheSun.gp5", "BeautyAndTheBeast.gp5", "NoteEffects.gp5"]
+)
+def test_incremental_render(sample):
+    with get_sample(sample).open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    track = song.tracks[0]
+    incremental = IncrementalRender(song)
+    assert incremental.text == render_song(song)
+
+    rng = random.Random(sample)
+    for _ in range(40):
+        dirty = rng.sample(range(len(track.measures)), rng.randint(1, 3))
+        undos = []
+        for i in dirty:
+            beats = [beat for beat in track.measures[i].voices[0].beats if beat.notes]
+            if not beats:
+                continue
+            beat = rng.choice(beats)
+            if rng.random() < 0.2:
+                undos.append(_clear_beat(beat))
+            else:
+                undos.append(_edit_note(rng, rng.choice(beat.notes)))
+
+        try:
+            expected = render_song(song)
+        except Exception:
+            # Some edits make for songs we cannot render, like ties to nothing.
+            for undo in reversed(undos):
+                undo()
+            expected = render_song(song)
+
+        assert incremental.update(dirty) == expected
+
+
+def test_update_out_of_range():
+    with get_sample("CarpetOfTheSun.gp5").open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    incremental = IncrementalRender(song)
+    for i in (-1, len(song.tracks[0].measures)):
+        with pytest.raises(IndexError):
+            incremental.update([0, i])
+    assert incremental.update([0]) == render_song(song)
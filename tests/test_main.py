@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import shutil
+import zipfile
+
+from tests.conftest import get_sample
+from typer.testing import CliRunner
+
+from tabim.bundle import MANIFEST_NAME
+from tabim.main import app
+
+runner = CliRunner()
+
+
+def test_render_bundle(tmp_path):
+    bundle = tmp_path / "out.zip"
+    result = runner.invoke(
+        app,
+        [
+            "render",
+            str(get_sample("TieNote.gp5")),
+            str(get_sample("CarpetOfTheSun.gp5")),
+            "--bundle",
+            str(bundle),
+            "--timeout",
+            "60",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    with zipfile.ZipFile(bundle) as archive:
+        manifest = [
+            json.loads(line)
+            for line in archive.read(MANIFEST_NAME).decode().splitlines()
+        ]
+        assert [entry["name"] for entry in manifest] == [
+            "TieNote.tab",
+            "CarpetOfTheSun.tab",
+        ]
+        assert "Carpet of the Sun" in archive.read("CarpetOfTheSun.tab").decode()
+
+
+def test_render_bundle_collisions_and_errors(tmp_path):
+    for root in ("a", "b"):
+        (tmp_path / root).mkdir()
+        shutil.copy(get_sample("TieNote.gp5"), tmp_path / root / "x.gp5")
+    (tmp_path / "b" / "broken.gp5").write_bytes(b"not a guitar pro file")
+
+    bundle = tmp_path / "out.zip"
+    result = runner.invoke(
+        app,
+        ["render", str(tmp_path / "a"), str(tmp_path / "b"), "--bundle", str(bundle)],
+    )
+    assert result.exit_code == 0, result.output
+
+    with zipfile.ZipFile(bundle) as archive:
+        manifest = [
+            json.loads(line)
+            for line in archive.read(MANIFEST_NAME).decode().splitlines()
+        ]
+        assert sorted(archive.namelist()) == ["MANIFEST.jsonl", "x-2.tab", "x.tab"]
+
+    assert [(entry["name"], entry["error"] is None) for entry in manifest] == [
+        ("x.tab", True),
+        ("broken.tab", False),
+        ("x-2.tab", True),
+    ]
+
+
+def test_render_page_out_of_range():
+    sample = str(get_sample("CarpetOfTheSun.gp5"))
+    result = runner.invoke(
+        app, ["render", sample, "--page-height", "40", "--page", "1"]
+    )
+    assert result.exit_code == 0
+    assert "Carpet of the Sun" in result.output
+
+    for page in ("0", "1000"):
+        result = runner.invoke(
+            app, ["render", sample, "--page-height", "40", "--page", page]
+        )
+        assert result.exit_code == 2
+
+
+def test_render_several_files(tmp_path):
+    samples = [str(get_sample("TieNote.gp5")), str(get_sample("Rests.gp5"))]
+    result = runner.invoke(app, ["render", *samples])
+    assert result.exit_code == 0, result.output
+    assert [line for line in result.output.splitlines() if "==>" in line] == [
+        f"==> {sample} <==" for sample in samples
+    ]
+
+    result = runner.invoke(app, ["render", str(tmp_path)])
+    assert result.exit_code == 2
+    assert "--bundle" in result.output
+
+
+def test_render_bundle_rejects_pages(tmp_path):
+    bundle = tmp_path / "out.zip"
+    for options in (["--page-height", "10"], ["--page-height", "10", "--page", "99"]):
+        result = runner.invoke(
+            app,
+            ["render", str(get_sample("TieNote.gp5")), "--bundle", str(bundle)]
+            + options,
+        )
+        assert result.exit_code == 2
+        assert not bundle.exists()
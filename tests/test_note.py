@@ -7,6 +7,7 @@ import rich
 from tests.conftest import get_sample
 
 from tabim.note import render_note
+from tabim.types import TabNote
 
 
 def _iter_notes(song: guitarpro.Song) -> Iterator[guitarpro.Note]:
@@ -29,3 +30,23 @@ def test_rests():
         except NotImplementedError:
             rich.print(note)
         prev = note
+
+
+def test_tie_chain():
+    beat = guitarpro.Beat(voice=None)
+    root = TabNote.play(guitarpro.Note(beat, value=5, type=guitarpro.NoteType.normal))
+    chain = [root]
+    for _ in range(10_000):
+        tie = guitarpro.Note(beat, value=0, type=guitarpro.NoteType.tie)
+        chain.append(TabNote.tie(tie, tie_note=chain[-1]))
+
+    assert all(note.fret == 5 for note in chain)
+    assert not any(note.is_cont for note in chain)
+
+    chain[-1].set_cont()
+    assert all(note.is_cont for note in chain)
+
+    # Notes tied after the chain is continued start out continued
+    tie = guitarpro.Note(beat, value=0, type=guitarpro.NoteType.tie)
+    assert TabNote.tie(tie, tie_note=chain[-1]).is_cont
+    assert not TabNote.play(tie).is_cont
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import guitarpro
+import pytest
+from tests.conftest import get_sample
+
+from tabim.config import LineConfig, LyricsPosition, RenderConfig
+from tabim.pages import PaginatedSong
+from tabim.song import render_song
+
+
+@pytest.mark.parametrize(
+    "sample", ["CarpetOfTheSun.gp5", "BeautyAndTheBeast.gp5", "NoteEffects.gp5"]
+)
+@pytest.mark.parametrize("page_height", [5, 20, 66])
+@pytest.mark.parametrize(
+    "config",
+    [
+        RenderConfig(),
+        RenderConfig(line=LineConfig(line_length=40, show_lyrics=False)),
+        RenderConfig(
+            line=LineConfig(
+                lyrics_position=LyricsPosition.Bottom, show_bar_numbers=False
+            )
+        ),
+    ],
+)
+def test_pages(sample, page_height, config):
+    with get_sample(sample).open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    paginated = PaginatedSong(song, page_height, config=config)
+    # Render out of order, to make sure pages do not depend on each other
+    pages = {i: paginated.render_page(i) for i in reversed(range(len(paginated)))}
+    assert "\n".join(pages[i] for i in range(len(paginated))) == render_song(
+        song, config=config
+    )
+
+    for i, page in pages.items():
+        entry = paginated.pages[i]
+        if entry.n_systems > 1:
+            assert len(page.splitlines()) <= page_height
+        assert str(entry.first_measure) in page or not config.line.show_bar_numbers
+        assert paginated.page_of_measure(entry.first_measure) == i
+        assert paginated.page_of_measure(entry.last_measure) == i
+
+
+def test_page_of_measure_out_of_range():
+    with get_sample("CarpetOfTheSun.gp5").open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    paginated = PaginatedSong(song, 20)
+    for measure in (0, len(song.tracks[0].measures) + 1):
+        with pytest.raises(IndexError):
+            paginated.page_of_measure(measure)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import copy
+
+import guitarpro
+import pytest
+from tests.conftest import get_sample
+
+from tabim.score import render_score
+from tabim.song import render_song
+
+
+def _parse(sample) -> guitarpro.Song:
+    with get_sample(sample).open("rb") as stream:
+        return guitarpro.parse(stream)
+
+
+def _add_whole_note_track(song: guitarpro.Song):
+    """
+    Add a copy of the first track that only plays the first beat of every measure,
+    held for the whole measure.
+    """
+    track = song.tracks[0]
+    new_track = copy.deepcopy(track)
+    new_track.number = len(song.tracks) + 1
+    for new_measure, measure in zip(new_track.measures, track.measures):
+        new_measure.header = measure.header
+        for voice in new_measure.voices:
+            voice.beats = voice.beats[:1]
+            for beat in voice.beats:
+                beat.duration = guitarpro.Duration(value=1)
+                for note in beat.notes:
+                    note.type = guitarpro.NoteType.normal
+    song.tracks.append(new_track)
+
+
+@pytest.mark.parametrize(
+    "sample", ["CarpetOfTheSun.gp5", "BeautyAndTheBeast.gp5", "NoteEffects.gp5"]
+)
+def test_single_track_score(sample):
+    song = _parse(sample)
+    assert render_score(song, [0]) == render_song(song)
+
+
+def test_aligned_tracks():
+    song = _parse("CarpetOfTheSun.gp5")
+    _add_whole_note_track(song)
+
+    systems = render_score(song).split("\n\n")
+    blocks = [
+        [line for line in system.splitlines() if "|" in line] for system in systems
+    ]
+    blocks = [block for block in blocks if block]
+    assert blocks and len(blocks) % 2 == 0
+
+    for first, second in zip(blocks[::2], blocks[1::2]):
+        assert len(first) == len(second) == 6
+        bars = {
+            tuple(i for i, char in enumerate(line) if char == "|")
+            for line in first + second
+        }
+        assert len(bars) == 1
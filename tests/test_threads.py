@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+
+import guitarpro
+import pytest
+from tests.conftest import get_sample
+
+from tabim.config import RenderConfig
+from tabim.song import render_many, render_song
+
+SAMPLES = [
+    "BasicSustain.gp5",
+    "BeautyAndTheBeast.gp5",
+    "CarpetOfTheSun.gp5",
+    "DifferentNotes.gp5",
+    "NoteEffects.gp5",
+    "TieNote.gp5",
+]
+
+
+def _parse_samples() -> list[guitarpro.Song]:
+    songs = []
+    for sample in SAMPLES:
+        with get_sample(sample).open("rb") as stream:
+            songs.append(guitarpro.parse(stream))
+    return songs
+
+
+def test_render_many():
+    songs = _parse_samples()
+    expected = [render_song(song) for song in songs]
+
+    # The same song objects are rendered on many threads at once
+    assert render_many(songs * 20, max_workers=8) == expected * 20
+
+
+def test_config_changed_while_rendering():
+    songs = _parse_samples() * 10
+    config = RenderConfig()
+    outputs = []
+    for line_length in (60, 80):
+        config.line.line_length = line_length
+        outputs.append([render_song(song, config=config) for song in songs])
+
+    done = threading.Event()
+
+    def toggle():
+        while not done.is_set():
+            config.line.line_length = 140 - config.line.line_length
+
+    toggler = threading.Thread(target=toggle)
+    toggler.start()
+    try:
+        results = [render_many([song], config=config)[0] for song in songs]
+    finally:
+        done.set()
+        toggler.join()
+
+    # Every render sees a single, consistent, line length
+    for i, result in enumerate(results):
+        assert result in (outputs[0][i], outputs[1][i])
+
+
+@pytest.mark.skipif(
+    getattr(sys, "_is_gil_enabled", lambda: True)(),
+    reason="Threads only scale without the GIL",
+)
+def test_render_many_scales():
+    songs = _parse_samples() * 20
+
+    def measure(max_workers: int) -> float:
+        start = time.perf_counter()
+        render_many(songs, max_workers=max_workers)
+        return time.perf_counter() - start
+
+    measure(4)  # Warm up
+    assert measure(4) < measure(1) / 1.5
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import base64
+import io
+import json
+
+import guitarpro
+from tests.conftest import get_sample
+
+from tabim.config import LyricsPosition, RenderConfig
+from tabim.song import TRUNCATED_NOTICE, render_song
+from tabim.worker import serve
+
+
+def _run(*jobs: str) -> list[dict]:
+    output = io.StringIO()
+    serve(io.StringIO("".join(job + "\n" for job in jobs)), output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_worker():
+    sample = get_sample("CarpetOfTheSun.gp5")
+    with sample.open("rb") as stream:
+        song = guitarpro.parse(stream)
+
+    config = RenderConfig()
+    config.line.line_length = 80
+    config.line.lyrics_position = LyricsPosition.Bottom
+
+    results = _run(
+        json.dumps({"id": "path", "path": str(sample)}),
+        json.dumps(
+            {
+                "id": "data",
+                "data": base64.b64encode(sample.read_bytes()).decode(),
+                "config": {"line": {"line_length": 80, "lyrics_position": "bottom"}},
+            }
+        ),
+        "",
+        "not json",
+        json.dumps({"id": "bad-track", "path": str(sample), "tracks": [7]}),
+        json.dumps({"id": "bad-config", "path": str(sample), "config": {"x": {}}}),
+    )
+
+    assert [result["id"] for result in results] == [
+        "path",
+        "data",
+        None,
+        "bad-track",
+        "bad-config",
+    ]
+    assert [result["ok"] for result in results] == [True, True, False, False, False]
+    assert results[0]["tabs"] == [{"track_number": 0, "tab": render_song(song)}]
+    assert results[1]["tabs"][0]["tab"] == render_song(song, config=config)
+    assert results[3]["error"]["type"] == "IndexError"
+
+
+def test_worker_timeout():
+    sample = get_sample("CarpetOfTheSun.gp5")
+
+    results = _run(
+        json.dumps({"id": "expired", "path": str(sample), "timeout": 0}),
+        json.dumps({"id": "in-time", "path": str(sample), "timeout": 3600}),
+    )
+
+    assert [result["tabs"][0]["truncated"] for result in results] == [True, False]
+    assert results[0]["tabs"][0]["tab"].endswith(TRUNCATED_NOTICE)
+    assert results[1]["tabs"][0]["tab"] == render_song(guitarpro.parse(str(sample)))
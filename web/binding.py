@@ -2,7 +2,9 @@ import io
 
 import guitarpro
 
+from tabim.pages import PaginatedSong
 from tabim.song import render_song
+from tabim.types import PositionIndex
 
 
 def parse_song_from_buffer(buffer) -> guitarpro.Song:
@@ -14,3 +16,14 @@ def parse_song_from_buffer(buffer) -> guitarpro.Song:
 def render_song_from_buffer(buffer) -> str:
     song = parse_song_from_buffer(buffer)
     return render_song(song)
+
+
+def render_song_with_index_from_buffer(buffer) -> tuple[str, PositionIndex]:
+    song = parse_song_from_buffer(buffer)
+    index = PositionIndex()
+    return render_song(song, index=index), index
+
+
+def paginate_song_from_buffer(buffer, page_height: int) -> PaginatedSong:
+    song = parse_song_from_buffer(buffer)
+    return PaginatedSong(song, page_height)